@@ -3,7 +3,29 @@
 # WRITER : Avi Kupinsky avikupinsky 318336070
 # EXERCISE : softwareTesting  ex1 2023
 #############################################################
+import argparse
+import codecs
+import contextlib
+import functools
+import hashlib
+import io
+import itertools
+import json
+import locale
+import mmap
+import operator
+import os
+import re
+import stat
+import struct
 import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 TYPE = "Type"
 LEGNTH = "Length"
@@ -22,6 +44,32 @@ ERROR_INTEGER_WITH_STRING = "the first column is integer but in the third column
 ERROR_NOT_ENOUGH_BYTES = "the bytes that were given where not enough"
 ERROR_NOT_CURRENT_PARAMETERS = "there wasn't the current amount of parameters per line"
 ERROR_FIRST_COLUM = "there wasn't the 1 or 2 in the colum"
+ERROR_NOT_A_NUMBER = "the legnth or the value that was given is not a number"
+ERROR_IN_LINE = "line {}: {}"
+ERROR_JOBS_WITH_PIPE = "more than one job needs a regular file and not a pipe"
+ERROR_MMAP_WITH_PIPE = "the mmap scanner needs a regular file and not a pipe"
+ERROR_FOUND_ERRORS = "found {} errors"
+ERROR_NO_NUMPY = "the numpy engine needs numpy to be installed"
+ERROR_IN_FILE = "{}: {}"
+ERROR_FAILED_FILES = "{} files were not converted"
+ERROR_ONE_FILE_MODE = "this mode converts only one file"
+ERROR_RERENDER_NOT_SEEKABLE = "rerender on overflow needs an output that is a regular file"
+ERROR_WIDTHS = "the widths should be two numbers like 10,20"
+ERROR_INDEX_WITH_PIPE = "the index needs a regular file and not a pipe"
+ERROR_NOT_BINARY = "the file was not written by --emit binary"
+ERROR_ENGINE_WITH_MODE = "the numpy engine works only without a mode, on a regular file"
+
+# the code of every error and the colum it reports, None for the whole line
+ERROR_CODES = {
+    ERROR_STRING_LEGNTH: ("STRING_LEGNTH", 1),
+    ERROR_POWER_TWO: ("POWER_TWO", 1),
+    ERROR_STRING_WITH_INTEGER: ("STRING_WITH_INTEGER", 2),
+    ERROR_INTEGER_WITH_STRING: ("INTEGER_WITH_STRING", 2),
+    ERROR_NOT_ENOUGH_BYTES: ("NOT_ENOUGH_BYTES", 2),
+    ERROR_NOT_CURRENT_PARAMETERS: ("NOT_CURRENT_PARAMETERS", None),
+    ERROR_FIRST_COLUM: ("FIRST_COLUM", 0),
+    ERROR_NOT_A_NUMBER: ("NOT_A_NUMBER", None),
+}
 
 FIRST_COLUM = 0
 SECOND_COLUM = 1
@@ -29,31 +77,189 @@ THIRD_COLUM = 2
 NUMBER_IN_ROW = 3
 BIT_LEGNTH = 8
 
+STDIN = '-'
+SEPARATOR = ','
+NEW_LINE = '\n'
+MEMORY_BUDGET = 64 * 1024 * 1024
+
+TEXT_SCANNER = "text"
+MMAP_SCANNER = "mmap"
+COMMA_BYTE = b','
+NEW_LINE_BYTE = b'\n'
+CARRIAGE_RETURN = ord('\r')
+STRING_TYPE_BYTE = ord(STRING_TYPE)
+INTEGER_TYPE_BYTE = ord(INTEGER_TYPE)
+# the ascii characters str.strip() removes
+WHITE_SPACE_BYTES = frozenset(b' \t\n\r\x0b\x0c\x1c\x1d\x1e\x1f')
+WHITE_SPACE_CHARACTERS = bytes(sorted(WHITE_SPACE_BYTES))
+ASCII_DIGITS = re.compile(rb'[0-9]+')
+NON_ASCII = re.compile(rb'[\x80-\xff]')
+# a file opened with 'r' ends a line on \r\n, \n and a lone \r
+LINE_END = re.compile(rb'\r\n|\r|\n')
+LONE_CARRIAGE_RETURN = re.compile(rb'\r(?!\n)')
+# the ascii rows a block of the mmap scanner checks all at once, with the legnth and the value
+STRING_ROWS = re.compile(rb'^1,([0-9]+),([^,\r\n]*)\r?$', re.MULTILINE)
+INTEGER_ROWS = re.compile(rb'^2,([0-9]+),([0-9]+)\r?$', re.MULTILINE)
+
+ROW_ENGINE = "row"
+NUMPY_ENGINE = "numpy"
+# the longest legnth for which legnth * BIT_LEGNTH still fits in int64
+MAX_LEGNTH_DIGITS = 17
+# 2 ** bits has more than bits / 4 digits, so a value with fewer digits always fits
+BITS_PER_DIGIT = 4
+ZERO_BYTE = ord('0')
+
+TABLE_SUFFIX = ".txt"
+WRITE_BUFFER = 1 << 16
+
+TRUNCATE = "truncate"
+RERENDER = "rerender"
+TRUNCATE_MARKER = "~"
+
+INDEX_SUFFIX = ".idx"
+INDEX_VERSION = 1
+INDEX_KEYS = {"offset", "lines", "hash", "widths"}
+READ_CHUNK = 1 << 20
+
+TABLE_EMIT = "table"
+BINARY_EMIT = "binary"
+BINARY_MAGIC = b'EX1B'
+BINARY_VERSION = 1
+# the magic, the version, a reserved field and the number of rows
+BINARY_HEADER = struct.Struct('<4sHHQ')
+ROWS_FIELD = struct.Struct('<Q')
+ROWS_OFFSET = 8
+# the row count of a file whose sink could not be sought back to
+UNKNOWN_ROWS = (1 << 64) - 1
+# the type of the row and the size of the payload in bytes
+RECORD_HEADER = struct.Struct('<BI')
+STRING_RECORD = 1
+INTEGER_RECORD = 2
+BINARY_ENCODING = 'utf-8'
+
+
+class ConverterError(Exception):
+    """
+    an error in the csv file, the functions of the converter raise it instead
+    of exiting and the command line exits with its message
+    """
+
+    def __init__(self, error, line_number=None):
+        """
+        :param error: one of the ERROR_ messages
+        :param line_number: the line of the error, if it is known
+        """
+        super().__init__(error)
+        self.error = error
+        self.code = ERROR_CODES[error][0]
+        self.line_number = line_number
+
+    def __str__(self):
+        return self.error
+
+    def __reduce__(self):
+        return type(self), (self.error, self.line_number)
+
+
+class RowFormatError(ConverterError):
+    """
+    a row without 3 columns, or without 1 or 2 in the first colum
+    """
+
 
-def finding_legnth_columns(csv_file):
+class StringRowError(ConverterError):
+    """
+    a string row that holds a number or doesn't match its legnth
+    """
+
+
+class IntegerRowError(ConverterError):
+    """
+    an integer row that holds a string or doesn't fit in its bytes
+    """
+
+
+ERROR_CLASSES = {
+    ERROR_STRING_LEGNTH: StringRowError,
+    ERROR_POWER_TWO: IntegerRowError,
+    ERROR_STRING_WITH_INTEGER: StringRowError,
+    ERROR_INTEGER_WITH_STRING: IntegerRowError,
+    ERROR_NOT_ENOUGH_BYTES: IntegerRowError,
+    ERROR_NOT_CURRENT_PARAMETERS: RowFormatError,
+    ERROR_FIRST_COLUM: RowFormatError,
+    ERROR_NOT_A_NUMBER: RowFormatError,
+}
+
+
+def converter_error(error, line_number=None):
+    """
+    :param error: one of the ERROR_ messages
+    :param line_number: the line of the error, if it is known
+    :return: the exception of the right type for the error
+    """
+    return ERROR_CLASSES[error](error, line_number)
+
+
+def finding_legnth_columns(csv_file, spool=None):
     """
     finding the legnth of the second and third columns
     :param csv_file: the csv file we are reading from
+    :param spool: if given, every checked row is also written there in the
+    form it is printed, so the file doesn't need to be read a second time
     :return: the max legnth of the columns
     """
     second_column_legnth = len(LEGNTH)
     third_column_legnth = len(VALUE)
-    for line in csv_file:
-        elements = line.split(',')
-        if len(elements) != NUMBER_IN_ROW:
-            sys.exit(ERROR_NOT_CURRENT_PARAMETERS)
-        # if the first colum is a string
-        if elements[FIRST_COLUM] == STRING_TYPE:
-            second_column_legnth = first_colum_string(elements, second_column_legnth)
-        elif elements[FIRST_COLUM] == INTEGER_TYPE:
-            # if it's an integer
-            second_column_legnth = first_colum_integer(elements, second_column_legnth)
-        else:
-            sys.exit(ERROR_FIRST_COLUM)
-        third_column_legnth = max(third_column_legnth, len(elements[THIRD_COLUM].strip()))
+    line_number = 0
+    try:
+        for line_number, line in enumerate(csv_file, 1):
+            elements = line.split(',')
+            if len(elements) != NUMBER_IN_ROW:
+                raise converter_error(ERROR_NOT_CURRENT_PARAMETERS)
+            # if the first colum is a string
+            if elements[FIRST_COLUM] == STRING_TYPE:
+                second_column_legnth = first_colum_string(elements, second_column_legnth)
+            elif elements[FIRST_COLUM] == INTEGER_TYPE:
+                # if it's an integer
+                second_column_legnth = first_colum_integer(elements, second_column_legnth)
+            else:
+                raise converter_error(ERROR_FIRST_COLUM)
+            third_column_legnth = max(third_column_legnth, len(elements[THIRD_COLUM].strip()))
+            if spool is not None:
+                spool.write(spooling_row(elements))
+    except ConverterError as error:
+        error.line_number = line_number
+        raise
+    except UnicodeDecodeError:
+        # a ValueError too, but it is the file that can't be read and not a number in it
+        raise
+    except ValueError:
+        raise converter_error(ERROR_NOT_A_NUMBER, line_number) from None
     return second_column_legnth, third_column_legnth
 
 
+def spooling_row(elements):
+    """
+    turning a checked row into the compact line we keep until the widths are known,
+    the type and the cell of the second colum are already in the printed form
+    :param elements: the elements of the scv file
+    :return: the line to write to the spool
+    """
+    second_cell, third_cell = row_cells(elements)
+    return elements[FIRST_COLUM] + SEPARATOR + second_cell + SEPARATOR + third_cell + NEW_LINE
+
+
+def row_cells(elements):
+    """
+    the cells of the second and third columns of a checked row, the way they are printed
+    :param elements: the elements of the scv file
+    :return: the cell of the second colum and of the third colum
+    """
+    if elements[FIRST_COLUM] == STRING_TYPE:
+        return elements[SECOND_COLUM], elements[THIRD_COLUM].strip()
+    return str(int(elements[SECOND_COLUM]) * BIT_LEGNTH) + BIT, elements[THIRD_COLUM].strip()
+
+
 def first_colum_string(elements, second_column_legnth):
     """
     checking that all the parameters are current if its a string
@@ -61,13 +267,25 @@ def first_colum_string(elements, second_column_legnth):
     :param second_column_legnth: the current legnth of the second colum
     :return: the max legnth
     """
+    error = checking_string(elements)
+    if error is not None:
+        raise converter_error(error)
+    return max(second_column_legnth, len(elements[SECOND_COLUM]))
+
+
+def checking_string(elements):
+    """
+    checking a string row without exiting
+    :param elements: the elements of the scv file
+    :return: the error of the row, None if it is current
+    """
     # if the first colum said it's a sting but the third colum is a int
     if elements[THIRD_COLUM].strip().isnumeric():
-        sys.exit(ERROR_STRING_WITH_INTEGER)
+        return ERROR_STRING_WITH_INTEGER
     # if the number of bites dos not mach
     elif len(elements[THIRD_COLUM].strip()) != int(elements[SECOND_COLUM]):
-        sys.exit(ERROR_STRING_LEGNTH)
-    return max(second_column_legnth, len(elements[SECOND_COLUM]))
+        return ERROR_STRING_LEGNTH
+    return None
 
 
 def first_colum_integer(elements, second_column_legnth):
@@ -77,33 +295,1329 @@ def first_colum_integer(elements, second_column_legnth):
     :param second_column_legnth: the current legnth of the second colum
     :return: the max legnth
     """
+    error = checking_integer(elements)
+    if error is not None:
+        raise converter_error(error)
+    return max(second_column_legnth, len(str(BIT_LEGNTH * int(elements[SECOND_COLUM])) + BIT))
+
+
+def checking_integer(elements):
+    """
+    checking a integer row without exiting
+    :param elements: the elements of the scv file
+    :return: the error of the row, None if it is current
+    """
     # if the first colum said it's a integer but the third colum is a string
     if not elements[THIRD_COLUM].strip().isnumeric():
-        sys.exit(ERROR_INTEGER_WITH_STRING)
+        return ERROR_INTEGER_WITH_STRING
     bit_number = BIT_LEGNTH * int(elements[SECOND_COLUM])
     # checking that it is the power of 2
     check_power_two = bit_number and (not (bit_number & (bit_number - 1)))
     if not check_power_two:
-        sys.exit(ERROR_POWER_TWO)
+        return ERROR_POWER_TWO
     elif bit_number < int(elements[THIRD_COLUM].strip()).bit_length():
-        sys.exit(ERROR_NOT_ENOUGH_BYTES)
-    return max(second_column_legnth, len(str(bit_number) + BIT))
+        return ERROR_NOT_ENOUGH_BYTES
+    return None
 
 
-if __name__ == '__main__':
-    with open(sys.argv[1], 'r') as f:
-        x, y = finding_legnth_columns(f)
-        f.close()
-    print(PIPE + TYPE.ljust(len(INTEGER)) + PIPE + LEGNTH.ljust(x) + PIPE + VALUE.ljust(y) + PIPE)
-    print(PIPE + UNDER_LINE*len(INTEGER) + PIPE + UNDER_LINE*x + PIPE + UNDER_LINE*y + PIPE)
-    with open(sys.argv[1], 'r') as f:
-        for line in f:
+def checking_row(elements):
+    """
+    checking any row without exiting
+    :param elements: the elements of the scv file
+    :return: the error of the row, None if it is current
+    """
+    if len(elements) != NUMBER_IN_ROW:
+        return ERROR_NOT_CURRENT_PARAMETERS
+    elif elements[FIRST_COLUM] == STRING_TYPE:
+        return checking_string(elements)
+    elif elements[FIRST_COLUM] == INTEGER_TYPE:
+        return checking_integer(elements)
+    return ERROR_FIRST_COLUM
+
+
+def reporting_all(csv_file, max_errors=None):
+    """
+    checking the whole file in one pass and collecting all the errors
+    instead of exiting on the first one
+    :param csv_file: the csv file we are reading from
+    :param max_errors: stop after this many errors, None for no limit
+    :return: a list of (line number, error code, the field with the error, error)
+    """
+    errors = []
+    for line_number, line in enumerate(csv_file, 1):
+        elements = line.split(',')
+        try:
+            error = checking_row(elements)
+        except ValueError:
+            error = ERROR_NOT_A_NUMBER
+        if error is None:
+            continue
+        code, column = ERROR_CODES[error]
+        field = line.rstrip('\r\n') if column is None else elements[column].strip()
+        errors.append((line_number, code, field, error))
+        if max_errors is not None and len(errors) >= max_errors:
+            break
+    return errors
+
+
+def printing_errors(errors):
+    """
+    printing the errors of reporting_all as json lines
+    :param errors: the errors that were found
+    """
+    for line_number, code, field, error in errors:
+        print(json.dumps({"line": line_number, "code": code, "field": field, "message": error}))
+
+
+def splitting_file(path, jobs):
+    """
+    splitting the file to chunks of about the same size, every chunk
+    starts right after a new line so no row is cut in the middle
+    :param path: the path of the csv file
+    :param jobs: the number of chunks we want
+    :return: a list of (start, end) byte offsets
+    """
+    size = os.path.getsize(path)
+    offsets = [0]
+    with open(path, 'rb') as f:
+        for i in range(1, jobs):
+            f.seek(max(size * i // jobs, offsets[-1] + 1) - 1)
+            f.readline()
+            if f.tell() >= size:
+                break
+            offsets.append(f.tell())
+    offsets.append(size)
+    return list(zip(offsets[:-1], offsets[1:]))
+
+
+def checking_chunk(path, start, end):
+    """
+    checking one chunk of the file and finding the legnth of its columns,
+    runs in a worker process so the errors are returned and not raised
+    :param path: the path of the csv file
+    :param start: the offset of the first byte of the chunk
+    :param end: the offset after the last byte of the chunk
+    :return: the number of lines, the max legnth of the columns, and the line
+    in the chunk and the message of the first error (None if there is no error)
+    """
+    lines_read = 0
+    encoding = locale.getpreferredencoding(False)
+
+    def counting_lines(f):
+        # the chunk is read one line at a time, and gives the lines a file opened with 'r' would give
+        nonlocal lines_read
+        position = start
+        while position < end:
+            line = f.readline()
+            if not line:
+                break
+            position += len(line)
+            text = line.decode(encoding)
+            for text_line in io.StringIO(text, newline=None) if '\r' in text else (text,):
+                lines_read += 1
+                yield text_line
+
+    with open(path, 'rb') as f:
+        f.seek(start)
+        try:
+            x, y = finding_legnth_columns(counting_lines(f))
+        except ConverterError as error:
+            return lines_read, 0, 0, error.line_number, error.error
+    return lines_read, x, y, None, None
+
+
+def parallel_legnth_columns(path, jobs):
+    """
+    finding the legnth of the second and third columns with a pool of processes,
+    the error that is reported is the one with the smallest line number
+    :param path: the path of the csv file
+    :param jobs: the number of processes
+    :return: the max legnth of the columns
+    """
+    chunks = splitting_file(path, jobs)
+    with ProcessPoolExecutor(max_workers=min(jobs, len(chunks))) as pool:
+        results = list(pool.map(checking_chunk, [path] * len(chunks), *zip(*chunks)))
+    second_column_legnth = len(LEGNTH)
+    third_column_legnth = len(VALUE)
+    lines_before = 0
+    for lines_read, x, y, error_line, error in results:
+        if error is not None:
+            raise converter_error(error, lines_before + error_line)
+        lines_before += lines_read
+        second_column_legnth = max(second_column_legnth, x)
+        third_column_legnth = max(third_column_legnth, y)
+    return second_column_legnth, third_column_legnth
+
+
+def scanning_rows(buffer, start=0, stop=None):
+    """
+    finding the rows and the commas in the buffer without copying it, the rows
+    end where the lines of a file opened with 'r' end
+    :param buffer: the mmap of the csv file
+    :param start: the offset of the first row
+    :param stop: the offset after the last row, the end of the buffer if None
+    :return: a generator of (start, first comma, second comma, end) offsets of
+    every row, the end is before the new line and the second comma is -1 if
+    the row doesn't have exactly 3 columns
+    """
+    stop = len(buffer) if stop is None else stop
+    # only a file with a lone \r needs the slower search for every kind of line end
+    has_lone_carriage_return = LONE_CARRIAGE_RETURN.search(buffer, start, stop) is not None
+    while start < stop:
+        if has_lone_carriage_return:
+            line_end = LINE_END.search(buffer, start, stop)
+            end, next_start = (stop, stop) if line_end is None else line_end.span()
+        else:
+            end = buffer.find(NEW_LINE_BYTE, start, stop)
+            next_start = end + 1
+            if end == -1:
+                end = next_start = stop
+            if end > start and buffer[end - 1] == CARRIAGE_RETURN:
+                end -= 1
+        first_comma = buffer.find(COMMA_BYTE, start, end)
+        second_comma = buffer.find(COMMA_BYTE, first_comma + 1, end) if first_comma != -1 else -1
+        if second_comma != -1 and buffer.find(COMMA_BYTE, second_comma + 1, end) != -1:
+            second_comma = -1
+        yield start, first_comma, second_comma, end
+        start = next_start
+
+
+def stripping_offsets(buffer, start, end):
+    """
+    moving the offsets of an ascii field past the white spaces, like str.strip()
+    :return: the offsets of the stripped field
+    """
+    while start < end and buffer[start] in WHITE_SPACE_BYTES:
+        start += 1
+    while end > start and buffer[end - 1] in WHITE_SPACE_BYTES:
+        end -= 1
+    return start, end
+
+
+def mmap_legnth_columns(buffer, view, encoding, block_size=READ_CHUNK):
+    """
+    finding the legnth of the second and third columns straight from the bytes,
+    block by block with bulk_checking_block, a block it can't check is checked
+    row by row with checking_mmap_rows so the errors are exactly the same
+    :param buffer: the mmap of the csv file
+    :param view: a memoryview of the mmap
+    :param encoding: the encoding of the file
+    :param block_size: how many bytes are checked at once
+    :return: the max legnth of the columns
+    """
+    second_column_legnth = len(LEGNTH)
+    third_column_legnth = len(VALUE)
+    # the lines of a file with a lone \r are not counted by its \n, it is checked in one piece
+    if LONE_CARRIAGE_RETURN.search(buffer) is not None:
+        return checking_mmap_rows(buffer, view, encoding, 0, len(buffer))
+    lines_before = 0
+    for start, end in splitting_blocks(buffer, block_size):
+        block = buffer[start:end]
+        legnths = None if NON_ASCII.search(block) else bulk_checking_block(block)
+        if legnths is None:
+            try:
+                legnths = checking_mmap_rows(buffer, view, encoding, start, end)
+            except ConverterError as error:
+                error.line_number += lines_before
+                raise
+        second_column_legnth = max(second_column_legnth, legnths[0])
+        third_column_legnth = max(third_column_legnth, legnths[1])
+        lines_before += block.count(NEW_LINE_BYTE)
+    return second_column_legnth, third_column_legnth
+
+
+def splitting_blocks(buffer, block_size=READ_CHUNK):
+    """
+    splitting the buffer into blocks of whole lines, a \r\n is never cut
+    :param buffer: the mmap of the csv file
+    :param block_size: how many bytes are in a block, a line longer than that is a block
+    :return: a generator of the (start, end) offsets of the blocks
+    """
+    size = len(buffer)
+    start = 0
+    while start < size:
+        end = size
+        if start + block_size < size:
+            end = buffer.rfind(NEW_LINE_BYTE, start, start + block_size) + 1
+            if end <= start:
+                end = buffer.find(NEW_LINE_BYTE, start) + 1 or size
+        yield start, end
+        start = end
+
+
+def bulk_checking_block(block):
+    """
+    checking a block of ascii rows all at once, the rows are found by STRING_ROWS
+    and INTEGER_ROWS and their columns are checked by map, without python code
+    for every row
+    :param block: the bytes of whole lines of the file
+    :return: the max legnth of the columns in the block, or None if some row
+    could not be checked this way or has an error
+    """
+    rows = block.count(NEW_LINE_BYTE) + (not block.endswith(NEW_LINE_BYTE))
+    string_rows = STRING_ROWS.findall(block)
+    integer_rows = INTEGER_ROWS.findall(block)
+    if len(string_rows) + len(integer_rows) != rows:
+        return None
+    second_column_legnth = len(LEGNTH)
+    third_column_legnth = len(VALUE)
+    try:
+        if string_rows:
+            legnths, values = zip(*string_rows)
+            values = list(map(bytes.strip, values, itertools.repeat(WHITE_SPACE_CHARACTERS)))
+            if any(map(bytes.isdigit, values)) or \
+                    not all(map(operator.eq, map(len, values), map(int, legnths))):
+                return None
+            second_column_legnth = max(second_column_legnth, max(map(len, legnths)))
+            third_column_legnth = max(third_column_legnth, max(map(len, values)))
+        if integer_rows:
+            legnths, values = zip(*integer_rows)
+            longest_value = max(map(len, values))
+            # a value fits if it is below 2 ** bits, (digits, value) is compared with (digits, 2 ** bits)
+            limits = {}
+            for legnth in set(legnths):
+                bit_number = BIT_LEGNTH * int(legnth)
+                # checking that it is the power of 2
+                if not (bit_number and (not (bit_number & (bit_number - 1)))):
+                    return None
+                second_column_legnth = max(second_column_legnth, len(str(bit_number) + BIT))
+                # 2 ** bits has more than bits / 4 digits, more than any value here
+                limit = b'' if bit_number >= BITS_PER_DIGIT * longest_value else str(1 << bit_number).encode()
+                limits[legnth] = (len(limit) or longest_value + 1, limit)
+            # a value with zeros before it is longer than it looks, the rows check it
+            if not all(map(operator.lt, zip(map(len, values), values), map(limits.__getitem__, legnths))):
+                return None
+            third_column_legnth = max(third_column_legnth, longest_value)
+    except ValueError:
+        # a number that int can't read, the rows report it
+        return None
+    return second_column_legnth, third_column_legnth
+
+
+def checking_mmap_rows(buffer, view, encoding, rows_start, rows_stop):
+    """
+    finding the legnth of the second and third columns of some rows straight from
+    the bytes, ascii rows are checked on their offsets and only rows with other
+    characters are decoded and checked by first_colum_string and first_colum_integer
+    :param buffer: the mmap of the csv file
+    :param view: a memoryview of the mmap
+    :param encoding: the encoding of the file
+    :param rows_start: the offset of the first row
+    :param rows_stop: the offset after the last row
+    :return: the max legnth of the columns, an error has the line in the rows
+    """
+    second_column_legnth = len(LEGNTH)
+    third_column_legnth = len(VALUE)
+    # one search over all the rows saves searching every row of ascii rows
+    is_ascii = NON_ASCII.search(buffer, rows_start, rows_stop) is None
+    line_number = 0
+    rows = scanning_rows(buffer, rows_start, rows_stop)
+    try:
+        for line_number, (start, first_comma, second_comma, end) in enumerate(rows, 1):
+            if second_comma == -1:
+                raise converter_error(ERROR_NOT_CURRENT_PARAMETERS)
+            if not is_ascii and NON_ASCII.search(buffer, start, end):
+                elements = str(view[start:end], encoding).split(',')
+                if elements[FIRST_COLUM] == STRING_TYPE:
+                    second_column_legnth = first_colum_string(elements, second_column_legnth)
+                elif elements[FIRST_COLUM] == INTEGER_TYPE:
+                    second_column_legnth = first_colum_integer(elements, second_column_legnth)
+                else:
+                    raise converter_error(ERROR_FIRST_COLUM)
+                third_column_legnth = max(third_column_legnth, len(elements[THIRD_COLUM].strip()))
+                continue
+            value_start, value_end = stripping_offsets(buffer, second_comma + 1, end)
+            is_numeric = ASCII_DIGITS.fullmatch(buffer, value_start, value_end) is not None
+            if first_comma - start != 1:
+                raise converter_error(ERROR_FIRST_COLUM)
+            elif buffer[start] == STRING_TYPE_BYTE:
+                if is_numeric:
+                    raise converter_error(ERROR_STRING_WITH_INTEGER)
+                elif value_end - value_start != int(buffer[first_comma + 1:second_comma]):
+                    raise converter_error(ERROR_STRING_LEGNTH)
+                second_column_legnth = max(second_column_legnth, second_comma - first_comma - 1)
+            elif buffer[start] == INTEGER_TYPE_BYTE:
+                if not is_numeric:
+                    raise converter_error(ERROR_INTEGER_WITH_STRING)
+                bit_number = BIT_LEGNTH * int(buffer[first_comma + 1:second_comma])
+                if not (bit_number and (not (bit_number & (bit_number - 1)))):
+                    raise converter_error(ERROR_POWER_TWO)
+                elif bit_number < int(buffer[value_start:value_end]).bit_length():
+                    raise converter_error(ERROR_NOT_ENOUGH_BYTES)
+                second_column_legnth = max(second_column_legnth, len(str(bit_number) + BIT))
+            else:
+                raise converter_error(ERROR_FIRST_COLUM)
+            third_column_legnth = max(third_column_legnth, value_end - value_start)
+    except ConverterError as error:
+        error.line_number = line_number
+        raise
+    except UnicodeDecodeError:
+        # a ValueError too, but it is the file that can't be read and not a number in it
+        raise
+    except ValueError:
+        raise converter_error(ERROR_NOT_A_NUMBER, line_number) from None
+    return second_column_legnth, third_column_legnth
+
+
+def rendering_mmap_rows(buffer, view, encoding, x, y, block_size=READ_CHUNK):
+    """
+    the rows of the mmap under the header, a block of whole lines is decoded at
+    once and rendered by rendering_rows
+    :param buffer: the mmap of the csv file, after it was checked
+    :param view: a memoryview of the mmap
+    :param encoding: the encoding of the file
+    :param x: the legnth of the second colum
+    :param y: the legnth of the third colum
+    :param block_size: how many bytes are decoded at once
+    :return: a generator of the lines of the table, without the new line
+    """
+    for start, end in splitting_blocks(buffer, block_size):
+        yield from rendering_rows(io.StringIO(str(view[start:end], encoding), newline=None), x, y)
+
+
+def mmap_converting(path, sink=None, buffer_size=WRITE_BUFFER):
+    """
+    checking a regular file through the mmap scanner and writing its table
+    :param path: the path of the csv file
+    :param sink: where to write the table (see writing_lines), stdout if None
+    :param buffer_size: how many characters are written at once
+    """
+    sink = sys.stdout if sink is None else sink
+    encoding = locale.getpreferredencoding(False)
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            writing_lines(sink, rendering_header(len(LEGNTH), len(VALUE)), buffer_size)
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            view = memoryview(buffer)
+            try:
+                x, y = mmap_legnth_columns(buffer, view, encoding)
+                writing_lines(sink, itertools.chain(rendering_header(x, y),
+                                                    rendering_mmap_rows(buffer, view, encoding, x, y)), buffer_size)
+            finally:
+                view.release()
+
+
+def vector_checking_block(text):
+    """
+    checking a block of complete lines as numpy arrays of its bytes, the columns
+    are found once for the whole block so no python runs for every row
+    :param text: the lines of the block, every one ends with a new line
+    :return: the max legnth of the columns in the block, or None if some row
+    could not be checked this way or has an error
+    """
+    # only ascii rows are checked as arrays, anything else goes back to the rows
+    if not text.isascii():
+        return None
+    data = numpy.frombuffer(text.encode('ascii'), numpy.uint8)
+    new_lines = numpy.flatnonzero(data == ord(NEW_LINE))
+    commas = numpy.flatnonzero(data == ord(SEPARATOR))
+    rows = len(new_lines)
+    if rows == 0 or len(commas) != 2 * rows:
+        return None
+    starts = numpy.empty(rows, numpy.intp)
+    starts[0] = 0
+    starts[1:] = new_lines[:-1] + 1
+    first_commas, second_commas = commas[0::2], commas[1::2]
+    # with 2 commas for every row, a row that holds its own 2 commas has exactly 3 columns
+    if not ((first_commas == starts + 1) & (second_commas < new_lines)).all():
+        return None
+    strings = data[starts] == STRING_TYPE_BYTE
+    integers = data[starts] == INTEGER_TYPE_BYTE
+    if not (strings | integers).all():
+        return None
+    # the number of bytes that are not digits before every byte
+    not_digits = numpy.zeros(len(data) + 1, numpy.int32)
+    numpy.cumsum((data - ZERO_BYTE) > 9, out=not_digits[1:])
+    legnth_starts, legnth_ends = first_commas + 1, second_commas
+    value_starts, value_ends = second_commas + 1, new_lines
+    legnth_sizes, value_sizes = legnth_ends - legnth_starts, value_ends - value_starts
+    if (not_digits[legnth_ends] != not_digits[legnth_starts]).any() or \
+            not (0 < legnth_sizes).all() or not (legnth_sizes <= MAX_LEGNTH_DIGITS).all():
+        return None
+    # strip() would change a value that starts or ends with a white space
+    white_spaces = numpy.zeros(256, bool)
+    white_spaces[list(WHITE_SPACE_BYTES)] = True
+    filled = value_sizes > 0
+    if (white_spaces[data[value_starts[filled]]] | white_spaces[data[value_ends[filled] - 1]]).any():
+        return None
+    is_numeric = filled & (not_digits[value_ends] == not_digits[value_starts])
+    if (integers & ~is_numeric).any() or (strings & is_numeric).any():
+        return None
+    # the legnths, digit by digit from the right
+    legnths = numpy.zeros(rows, numpy.int64)
+    for place in range(int(legnth_sizes.max())):
+        has_place = legnth_sizes > place
+        legnths[has_place] += (data[legnth_ends[has_place] - 1 - place] - ZERO_BYTE).astype(numpy.int64) * 10 ** place
+    if (strings & (legnths != value_sizes)).any():
+        return None
+    bit_numbers = legnths[integers] * BIT_LEGNTH
+    # checking that it is the power of 2
+    if not ((bit_numbers != 0) & ((bit_numbers & (bit_numbers - 1)) == 0)).all():
+        return None
+    integer_starts, integer_sizes = value_starts[integers], value_sizes[integers]
+    # a value with as many digits as 2 ** bits is compared with it digit by digit
+    close = bit_numbers < BITS_PER_DIGIT * integer_sizes
+    for bit_number in numpy.unique(bit_numbers[close]):
+        limit = numpy.frombuffer(str(1 << int(bit_number)).encode('ascii'), numpy.uint8)
+        same_bits = close & (bit_numbers == bit_number)
+        if (integer_sizes[same_bits] > len(limit)).any():
+            return None
+        same_starts = integer_starts[same_bits & (integer_sizes == len(limit))]
+        digits = data[same_starts[:, None] + numpy.arange(len(limit))]
+        differ = digits != limit
+        first_difference = differ.argmax(axis=1)
+        if not (differ.any(axis=1) & (digits[numpy.arange(len(digits)), first_difference]
+                                      < limit[first_difference])).all():
+            return None
+    second_column_legnth = len(LEGNTH)
+    if strings.any():
+        second_column_legnth = max(second_column_legnth, int(legnth_sizes[strings].max()))
+    if integers.any():
+        second_column_legnth = max(second_column_legnth, len(str(int(bit_numbers.max())) + BIT))
+    return second_column_legnth, max(len(VALUE), int(value_sizes.max()))
+
+
+def numpy_legnth_columns(csv_file, block_size=READ_CHUNK):
+    """
+    finding the legnth of the second and third columns block by block with
+    vector_checking_block, a block it can't check is checked again row by
+    row with finding_legnth_columns so the errors are exactly the same
+    :param csv_file: the csv file we are reading from
+    :param block_size: how many characters are read for a block
+    :return: the max legnth of the columns
+    """
+    second_column_legnth = len(LEGNTH)
+    third_column_legnth = len(VALUE)
+    lines_before = 0
+    last_line = ''
+    for data in iter(functools.partial(csv_file.read, block_size), ''):
+        data = last_line + data
+        complete = data.rfind(NEW_LINE) + 1
+        block, last_line = data[:complete], data[complete:]
+        if not block:
+            continue
+        x, y = checking_numpy_block(block, lines_before)
+        second_column_legnth = max(second_column_legnth, x)
+        third_column_legnth = max(third_column_legnth, y)
+        lines_before += block.count(NEW_LINE)
+    if last_line:
+        # the new line doesn't change the row, the third colum is stripped
+        x, y = checking_numpy_block(last_line + NEW_LINE, lines_before)
+        second_column_legnth = max(second_column_legnth, x)
+        third_column_legnth = max(third_column_legnth, y)
+    return second_column_legnth, third_column_legnth
+
+
+def checking_numpy_block(block, lines_before):
+    """
+    checking one block for numpy_legnth_columns
+    :param block: the lines of the block
+    :param lines_before: the number of lines before the block, for the line of an error
+    :return: the max legnth of the columns in the block
+    """
+    legnths = vector_checking_block(block)
+    if legnths is not None:
+        return legnths
+    try:
+        return finding_legnth_columns(io.StringIO(block))
+    except ConverterError as error:
+        error.line_number += lines_before
+        raise
+
+
+def rendering_header(x, y):
+    """
+    the first two lines of the table
+    :param x: the legnth of the second colum
+    :param y: the legnth of the third colum
+    :return: a generator of the lines, without the new line
+    """
+    yield PIPE + TYPE.ljust(len(INTEGER)) + PIPE + LEGNTH.ljust(x) + PIPE + VALUE.ljust(y) + PIPE
+    yield PIPE + UNDER_LINE*len(INTEGER) + PIPE + UNDER_LINE*x + PIPE + UNDER_LINE*y + PIPE
+
+
+def row_templates(x, y):
+    """
+    the format templates of the rows, so a row is built with one format call
+    instead of joining the padded cells
+    :param x: the legnth of the second colum
+    :param y: the legnth of the third colum
+    :return: the template of a string row and of an integer row, both take
+    the cell of the second colum and the cell of the third colum
+    """
+    cells = PIPE + '{:<' + str(x) + '}' + PIPE + '{:<' + str(y) + '}' + PIPE
+    return PIPE + STRING.ljust(len(INTEGER)) + cells, PIPE + INTEGER.ljust(len(STRING)) + cells
+
+
+def rendering_rows(csv_file, x, y):
+    """
+    the rows of the csv file under the header
+    :param csv_file: the csv file we are reading from, after it was checked
+    :param x: the legnth of the second colum
+    :param y: the legnth of the third colum
+    :return: a generator of the lines of the table, without the new line
+    """
+    string_row, integer_row = row_templates(x, y)
+    for line in csv_file:
+        elements = line.split(',')
+        if elements[FIRST_COLUM] == STRING_TYPE:
+            yield string_row.format(elements[SECOND_COLUM], elements[THIRD_COLUM].strip())
+        else:
+            yield integer_row.format(str(int(elements[SECOND_COLUM])*BIT_LEGNTH) + BIT, elements[THIRD_COLUM].strip())
+
+
+def rendering_spool(spool, x, y):
+    """
+    the rows that were kept in the spool by finding_legnth_columns
+    :param spool: the spool, rewinded to the start
+    :param x: the legnth of the second colum
+    :param y: the legnth of the third colum
+    :return: a generator of the lines of the table, without the new line
+    """
+    string_row, integer_row = row_templates(x, y)
+    for line in spool:
+        type_cell, second_cell, third_cell = line[:-1].split(SEPARATOR)
+        if type_cell == STRING_TYPE:
+            yield string_row.format(second_cell, third_cell)
+        else:
+            yield integer_row.format(second_cell, third_cell)
+
+
+def writing_lines(sink, lines, buffer_size=WRITE_BUFFER, flush=False):
+    """
+    writing lines of the table to the sink, every line with a new line after it.
+    the lines are joined and written in chunks of about buffer_size characters
+    instead of one write for every line
+    :param sink: anything with a write method, or a file descriptor to write
+    the encoded chunks to with os.write
+    :param lines: the lines to write
+    :param buffer_size: how many characters are written at once
+    :param flush: flush the sink after every chunk, so the lines show up right away
+    """
+    chunk = []
+    chunk_size = 0
+    for line in lines:
+        chunk.append(line)
+        chunk_size += len(line)
+        if chunk_size >= buffer_size:
+            writing_chunk(sink, chunk, flush)
+            chunk = []
+            chunk_size = 0
+    if chunk:
+        writing_chunk(sink, chunk, flush)
+
+
+def writing_chunk(sink, chunk, flush=False):
+    """
+    writing one chunk of lines for writing_lines
+    :param sink: anything with a write method, or a file descriptor
+    :param chunk: the lines of the chunk
+    :param flush: flush the sink after the chunk, a file descriptor has nothing to flush
+    """
+    data = NEW_LINE.join(chunk) + NEW_LINE
+    if not isinstance(sink, int):
+        sink.write(data)
+        if flush and hasattr(sink, "flush"):
+            sink.flush()
+        return
+    writing_bytes(sink, data.encode(locale.getpreferredencoding(False)))
+
+
+def writing_bytes(sink, data):
+    """
+    writing bytes to a binary sink, a file descriptor is written until all of them went out
+    :param sink: anything with a write method that takes bytes, or a file descriptor
+    :param data: bytes, a bytearray or a memoryview
+    """
+    if not isinstance(sink, int):
+        sink.write(data)
+        return
+    view = memoryview(data)
+    while view:
+        view = view[os.write(sink, view):]
+
+
+def printing_header(x, y):
+    """
+    printing the first two lines of the table
+    :param x: the legnth of the second colum
+    :param y: the legnth of the third colum
+    """
+    writing_lines(sys.stdout, rendering_header(x, y))
+
+
+def printing_rows(csv_file, x, y):
+    """
+    printing the rows of the csv file under the header
+    :param csv_file: the csv file we are reading from, after it was checked
+    :param x: the legnth of the second colum
+    :param y: the legnth of the third colum
+    """
+    writing_lines(sys.stdout, rendering_rows(csv_file, x, y))
+
+
+def is_pipe(path):
+    """
+    checking if the input can only be read once (stdin, a pipe or a fifo)
+    :param path: the path that was given in the command line
+    :return: True if we can't open the file a second time
+    """
+    if path == STDIN:
+        return True
+    try:
+        return not stat.S_ISREG(os.stat(path).st_mode)
+    except OSError:
+        return False
+
+
+def writing_table(source, sink, memory_budget=MEMORY_BUDGET, buffer_size=WRITE_BUFFER):
+    """
+    checking a csv file and writing its table. a path of a regular file is read
+    twice, anything else is read once and every row is kept in a spool that
+    stays in memory until it passes the budget, and then moves to a temp file
+    :param source: the path of the csv file, or an open csv file
+    :param sink: anything with a write method, or a file descriptor
+    :param memory_budget: how many characters the spool keeps in memory
+    :param buffer_size: how many characters are written at once
+    """
+    if isinstance(source, (str, os.PathLike)):
+        if not is_pipe(source):
+            with open(source, 'r') as f:
+                x, y = finding_legnth_columns(f)
+            with open(source, 'r') as f:
+                writing_lines(sink, itertools.chain(rendering_header(x, y), rendering_rows(f, x, y)), buffer_size)
+            return
+        with open(source, 'r') as f:
+            writing_table(f, sink, memory_budget, buffer_size)
+        return
+    with tempfile.SpooledTemporaryFile(max_size=memory_budget, mode='w+', newline='') as spool:
+        x, y = finding_legnth_columns(source, spool)
+        spool.seek(0)
+        writing_lines(sink, itertools.chain(rendering_header(x, y), rendering_spool(spool, x, y)), buffer_size)
+
+
+class BinaryWriter:
+    """
+    packing checked rows into records in a buffer that is made once, the buffer
+    is written to the sink only when the next record doesn't fit in it.
+    the file starts with BINARY_HEADER, then every row is a RECORD_HEADER and its
+    payload: the utf-8 bytes of a string, or the value of an integer in the
+    little endian bytes of its legnth
+    """
+
+    def __init__(self, sink, buffer_size=WRITE_BUFFER):
+        """
+        :param sink: anything with a write method that takes bytes, or a file descriptor
+        :param buffer_size: how many bytes are written at once
+        """
+        self.sink = sink
+        self.buffer = bytearray(max(buffer_size, BINARY_HEADER.size))
+        self.view = memoryview(self.buffer)
+        self.rows = 0
+        # the row count is written again at the end if we can go back to the header
+        self.start = telling(sink) if is_seekable(sink) else None
+        BINARY_HEADER.pack_into(self.buffer, 0, BINARY_MAGIC, BINARY_VERSION, 0, UNKNOWN_ROWS)
+        self.position = BINARY_HEADER.size
+
+    def adding_row(self, elements):
+        """
+        packing one checked row
+        :param elements: the elements of the scv file
+        """
+        if elements[FIRST_COLUM] == STRING_TYPE:
+            record_type = STRING_RECORD
+            payload = elements[THIRD_COLUM].strip().encode(BINARY_ENCODING)
+        else:
+            record_type = INTEGER_RECORD
+            payload = int(elements[THIRD_COLUM].strip()).to_bytes(int(elements[SECOND_COLUM]), 'little')
+        end = self.position + RECORD_HEADER.size + len(payload)
+        if end > len(self.buffer):
+            self.flushing()
+            end = RECORD_HEADER.size + len(payload)
+        if end > len(self.buffer):
+            # a record that is bigger than the whole buffer goes straight to the sink
+            writing_bytes(self.sink, RECORD_HEADER.pack(record_type, len(payload)))
+            writing_bytes(self.sink, payload)
+        else:
+            RECORD_HEADER.pack_into(self.buffer, self.position, record_type, len(payload))
+            self.view[end - len(payload):end] = payload
+            self.position = end
+        self.rows += 1
+
+    def flushing(self):
+        """
+        writing what is in the buffer to the sink
+        """
+        if self.position:
+            writing_bytes(self.sink, self.view[:self.position])
+            self.position = 0
+
+    def closing(self):
+        """
+        writing the rest of the buffer and the number of rows in the header
+        """
+        self.flushing()
+        if self.start is None:
+            return
+        rows = ROWS_FIELD.pack(self.rows)
+        if isinstance(self.sink, int):
+            os.pwrite(self.sink, rows, self.start + ROWS_OFFSET)
+            return
+        self.sink.seek(self.start + ROWS_OFFSET)
+        self.sink.write(rows)
+        self.sink.seek(0, os.SEEK_END)
+        self.sink.flush()
+
+
+def emitting_binary(csv_file, sink, buffer_size=WRITE_BUFFER):
+    """
+    checking every row and packing it with BinaryWriter in one pass, on an error
+    the rows before it are already in the sink
+    :param csv_file: the csv file we are reading from
+    :param sink: anything with a write method that takes bytes, or a file descriptor
+    :param buffer_size: how many bytes are written at once
+    :return: the number of rows
+    """
+    writer = BinaryWriter(sink, buffer_size)
+    line_number = 0
+    try:
+        for line_number, line in enumerate(csv_file, 1):
             elements = line.split(',')
-            if elements[FIRST_COLUM] == STRING_TYPE:
-                print(PIPE + STRING.ljust(len(INTEGER)) + PIPE + elements[SECOND_COLUM].ljust(x)
-                      + PIPE + elements[THIRD_COLUM].strip().ljust(y) + PIPE)
+            error = checking_row(elements)
+            if error is not None:
+                raise converter_error(error, line_number)
+            writer.adding_row(elements)
+    except UnicodeDecodeError:
+        raise
+    except ValueError:
+        raise converter_error(ERROR_NOT_A_NUMBER, line_number) from None
+    finally:
+        writer.closing()
+    return writer.rows
+
+
+def writing_binary(source, sink, buffer_size=WRITE_BUFFER):
+    """
+    checking a csv file and packing its rows. a path of a regular file is checked
+    first, so nothing is written if it has an error, anything else is packed in one pass
+    :param source: the path of the csv file, or an open csv file
+    :param sink: anything with a write method that takes bytes, or a file descriptor
+    :param buffer_size: how many bytes are written at once
+    :return: the number of rows
+    """
+    if not isinstance(source, (str, os.PathLike)):
+        return emitting_binary(source, sink, buffer_size)
+    if not is_pipe(source):
+        with open(source, 'r') as f:
+            finding_legnth_columns(f)
+    with open(source, 'r') as f:
+        return emitting_binary(f, sink, buffer_size)
+
+
+def reading_binary(path):
+    """
+    reading a file of --emit binary through mmap, the payloads are read from the
+    mapped bytes without copying the file
+    :param path: the path of the binary file
+    :return: a generator of (STRING_TYPE or INTEGER_TYPE, the size of the payload in bytes, the value)
+    """
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size < BINARY_HEADER.size:
+            raise ValueError(ERROR_NOT_BINARY)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            magic, version, _, _ = BINARY_HEADER.unpack_from(buffer, 0)
+            if magic != BINARY_MAGIC or version != BINARY_VERSION:
+                raise ValueError(ERROR_NOT_BINARY)
+            view = memoryview(buffer)
+            try:
+                position = BINARY_HEADER.size
+                while position < len(buffer):
+                    record_type, size = RECORD_HEADER.unpack_from(buffer, position)
+                    position += RECORD_HEADER.size
+                    # the slice is released before the row is given, a consumer that stops
+                    # early must not leave it holding the mmap open
+                    with view[position:position + size] as payload:
+                        if record_type == STRING_RECORD:
+                            row = STRING_TYPE, size, str(payload, BINARY_ENCODING)
+                        else:
+                            row = INTEGER_TYPE, size, int.from_bytes(payload, 'little')
+                    position += size
+                    yield row
+            finally:
+                view.release()
+
+
+def sampling_widths(csv_file, sample_rows):
+    """
+    finding the widths from the first rows of the file only
+    :param csv_file: the csv file we are reading from
+    :param sample_rows: how many rows to read
+    :return: the max legnth of the columns in the sample, and the lines of the sample
+    """
+    sample = list(itertools.islice(csv_file, sample_rows))
+    x, y = finding_legnth_columns(sample)
+    return x, y, sample
+
+
+def fitting_cell(cell, width):
+    """
+    cutting a cell that is longer than its colum, the end is replaced by a marker
+    :return: the cell that fits the width
+    """
+    if len(cell) <= width:
+        return cell
+    return cell[:width - len(TRUNCATE_MARKER)] + TRUNCATE_MARKER
+
+
+def is_live(csv_file):
+    """
+    checking if the rows of the input may come slowly (stdin, a pipe or a terminal)
+    :param csv_file: the csv file we are reading from
+    :return: True if it is not a regular file
+    """
+    try:
+        return not stat.S_ISREG(os.fstat(csv_file.fileno()).st_mode)
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return False
+
+
+def is_seekable(sink):
+    """
+    checking if we can go back and write the sink again
+    :param sink: anything with a write method, or a file descriptor
+    """
+    if isinstance(sink, int):
+        return stat.S_ISREG(os.fstat(sink).st_mode)
+    return sink.seekable()
+
+
+def telling(sink):
+    """
+    moving to the end of a seekable sink, the table starts there (a file that
+    was opened for appending reports 0 until something is written to it)
+    :param sink: a seekable sink, or a file descriptor of a regular file
+    :return: the position the next write goes to
+    """
+    if isinstance(sink, int):
+        return os.lseek(sink, 0, os.SEEK_END)
+    sink.flush()
+    return sink.seek(0, os.SEEK_END)
+
+
+def rewinding(sink, position):
+    """
+    removing everything that was written to a seekable sink after a position,
+    so the table can be written again from there
+    :param sink: a seekable sink, or a file descriptor of a regular file
+    :param position: where the table started, from telling
+    """
+    if isinstance(sink, int):
+        os.lseek(sink, position, os.SEEK_SET)
+        os.ftruncate(sink, position)
+        return
+    sink.seek(position)
+    sink.truncate()
+
+
+def streaming_table(csv_file, sink, x, y, on_overflow=TRUNCATE, first_lines=(),
+                    memory_budget=MEMORY_BUDGET, buffer_size=WRITE_BUFFER):
+    """
+    writing the table while the file is read, with widths that are known before
+    the whole file was checked (given by the user or by sampling_widths), so the
+    first rows come out right away. an error in the file stops the table in the middle.
+    a cell longer than its colum is cut with TRUNCATE_MARKER, or with RERENDER
+    the rest of the file is checked and the whole table is written again from
+    the start with the real widths, which needs a seekable sink, a ValueError is
+    raised for a sink that is not
+    :param csv_file: the csv file we are reading from
+    :param sink: anything with a write method, or a file descriptor
+    :param x: the legnth of the second colum
+    :param y: the legnth of the third colum
+    :param on_overflow: TRUNCATE or RERENDER
+    :param first_lines: lines that were already read from csv_file (the sample)
+    :param memory_budget: how many characters the spool of RERENDER keeps in memory
+    :param buffer_size: how many characters are written at once
+    """
+    x = max(x, len(LEGNTH))
+    y = max(y, len(VALUE))
+    start = None
+    if on_overflow == RERENDER:
+        if not is_seekable(sink):
+            raise ValueError(ERROR_RERENDER_NOT_SEEKABLE)
+        start = telling(sink)
+    writing_lines(sink, rendering_header(x, y), flush=True)
+    lines = itertools.chain(first_lines, csv_file)
+    string_row, integer_row = row_templates(x, y)
+    real_widths = [x, y]
+    overflow_line = None
+    with contextlib.ExitStack() as stack:
+        spool = None
+        if on_overflow == RERENDER:
+            spool = stack.enter_context(
+                tempfile.SpooledTemporaryFile(max_size=memory_budget, mode='w+', newline=''))
+
+        def streaming_rows():
+            nonlocal overflow_line
+            for line_number, line in enumerate(lines, 1):
+                elements = line.split(',')
+                try:
+                    error = checking_row(elements)
+                    second_cell, third_cell = (None, None) if error else row_cells(elements)
+                except ValueError:
+                    error = ERROR_NOT_A_NUMBER
+                if error is not None:
+                    raise converter_error(error, line_number)
+                if spool is not None:
+                    spool.write(spooling_row(elements))
+                real_widths[0] = max(real_widths[0], len(second_cell))
+                real_widths[1] = max(real_widths[1], len(third_cell))
+                if len(second_cell) > x or len(third_cell) > y:
+                    if spool is not None:
+                        overflow_line = line_number
+                        return
+                    second_cell, third_cell = fitting_cell(second_cell, x), fitting_cell(third_cell, y)
+                template = string_row if elements[FIRST_COLUM] == STRING_TYPE else integer_row
+                yield template.format(second_cell, third_cell)
+
+        rows = streaming_rows()
+        # the first row is written right away, and so is every row of an input whose rows may come slowly
+        writing_lines(sink, itertools.islice(rows, 1), flush=True)
+        writing_lines(sink, rows, 1 if is_live(csv_file) else buffer_size, flush=True)
+        if overflow_line is None:
+            return
+        try:
+            rest_x, rest_y = finding_legnth_columns(lines, spool)
+        except ConverterError as error:
+            error.line_number += overflow_line
+            raise
+        x, y = max(real_widths[0], rest_x), max(real_widths[1], rest_y)
+        spool.seek(0)
+        rewinding(sink, start)
+        writing_lines(sink, itertools.chain(rendering_header(x, y), rendering_spool(spool, x, y)), buffer_size)
+
+
+def reading_index(index_path):
+    """
+    reading the sidecar index of a csv file
+    :param index_path: the path of the index
+    :return: the index as a dict, or None if there is no usable index
+    """
+    try:
+        with open(index_path, 'r') as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(index, dict) or index.get("version") != INDEX_VERSION or not INDEX_KEYS <= index.keys():
+        return None
+    return index
+
+
+def writing_index(index_path, index):
+    """
+    writing the sidecar index, through a temp file so a reader never sees half of it
+    :param index_path: the path of the index
+    :param index: the index as a dict
+    """
+    temp_path = index_path + ".tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(index, f)
+    os.replace(temp_path, index_path)
+
+
+def hashing_prefix(f, offset):
+    """
+    hashing the first bytes of the file
+    :param f: the csv file, opened in binary mode at its start
+    :param offset: how many bytes to hash
+    :return: the hash object, so more bytes can be added to it
+    """
+    prefix_hash = hashlib.blake2b()
+    left = offset
+    while left > 0:
+        data = f.read(min(READ_CHUNK, left))
+        if not data:
+            break
+        prefix_hash.update(data)
+        left -= len(data)
+    return prefix_hash
+
+
+def indexed_legnth_columns(path, index_path=None):
+    """
+    finding the legnth of the second and third columns of a file that only
+    grows at its end. the index next to the file keeps how far the file was
+    checked, the widths up to there and a hash of that prefix, so only the new
+    tail is checked, a chunk at a time. if the prefix changed, the index is
+    ignored and the whole file is checked. the last line is kept out of the
+    index until it ends with a new line, because it may still be written
+    :param path: the path of the csv file
+    :param index_path: the path of the index, the csv path with INDEX_SUFFIX if None
+    :return: the max legnth of the columns
+    """
+    index_path = path + INDEX_SUFFIX if index_path is None else index_path
+    index = reading_index(index_path)
+    size = os.path.getsize(path)
+    decoder = codecs.getincrementaldecoder(locale.getpreferredencoding(False))()
+    with open(path, 'rb') as f:
+        offset, lines_before = 0, 0
+        second_column_legnth, third_column_legnth = len(LEGNTH), len(VALUE)
+        prefix_hash = hashlib.blake2b()
+        if index is not None and index["offset"] <= size:
+            prefix_hash = hashing_prefix(f, index["offset"])
+            if prefix_hash.hexdigest() == index["hash"]:
+                offset, lines_before = index["offset"], index["lines"]
+                second_column_legnth, third_column_legnth = index["widths"]
             else:
-                print(PIPE + INTEGER.ljust(len(STRING)) + PIPE
-                      + (str(int(elements[SECOND_COLUM])*BIT_LEGNTH) + BIT).ljust(x)
-                      + PIPE + elements[THIRD_COLUM].strip().ljust(y) + PIPE)
-        f.close()
\ No newline at end of file
+                f.seek(0)
+                prefix_hash = hashlib.blake2b()
+        # the file is read in chunks that end at a new line, they go into the hash and the
+        # index as they are read, and a file opened with 'r' would give the same lines
+        lines = 0
+        last_line = b''
+
+        def complete_lines():
+            nonlocal offset, lines, last_line
+            for data in iter(functools.partial(f.read, READ_CHUNK), b''):
+                data = last_line + data
+                complete = data.rfind(NEW_LINE_BYTE) + 1
+                last_line = data[complete:]
+                if not complete:
+                    continue
+                prefix_hash.update(memoryview(data)[:complete])
+                offset += complete
+                for line in io.StringIO(decoder.decode(data[:complete]), newline=None):
+                    lines += 1
+                    yield line
+
+        try:
+            x, y = finding_legnth_columns(complete_lines())
+        except ConverterError as error:
+            error.line_number += lines_before
+            raise
+    second_column_legnth = max(second_column_legnth, x)
+    third_column_legnth = max(third_column_legnth, y)
+    writing_index(index_path, {"version": INDEX_VERSION, "offset": offset, "lines": lines_before + lines,
+                               "hash": prefix_hash.hexdigest(),
+                               "widths": [second_column_legnth, third_column_legnth]})
+    if not last_line:
+        return second_column_legnth, third_column_legnth
+    try:
+        x, y = finding_legnth_columns(io.StringIO(decoder.decode(last_line, True), newline=None))
+    except ConverterError as error:
+        error.line_number += lines_before + lines
+        raise
+    return max(second_column_legnth, x), max(third_column_legnth, y)
+
+
+def converting_file(path):
+    """
+    converting one file to a table in memory, for convert_many. a file that can't be
+    read or decoded is an error of that file only, like a row error
+    :param path: the path of the csv file
+    :return: the path, the table and the error, the table or the error is None
+    """
+    sink = io.StringIO()
+    try:
+        writing_table(path, sink)
+    except (ConverterError, OSError, UnicodeDecodeError) as error:
+        return path, None, error
+    return path, sink.getvalue(), None
+
+
+def convert_many(paths, jobs=None):
+    """
+    converting many csv files in this process, so the interpreter starts only once
+    :param paths: the paths of the csv files
+    :param jobs: the number of worker processes, None or 1 to convert here
+    :return: a list of (path, table, error) in the order of the paths
+    """
+    if jobs is None or jobs <= 1:
+        return [converting_file(path) for path in paths]
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(converting_file, paths, chunksize=max(1, len(paths) // (jobs * 4))))
+
+
+def parsing_widths(text):
+    """
+    parsing the --widths argument
+    :param text: two numbers with a comma between them
+    :return: the legnth of the second and third columns
+    """
+    try:
+        x, y = (int(width) for width in text.split(SEPARATOR))
+    except ValueError:
+        raise argparse.ArgumentTypeError(ERROR_WIDTHS) from None
+    return x, y
+
+
+def opening_csv(path):
+    """
+    :param path: the path of the csv file, or - for stdin
+    :return: a context manager of the open csv file
+    """
+    if path == STDIN:
+        return contextlib.nullcontext(sys.stdin)
+    return open(path, 'r')
+
+
+def parsing_arguments(argv=None):
+    """
+    parsing the command line
+    :param argv: the arguments, sys.argv[1:] if None
+    :return: the parsed arguments
+    """
+    parser = argparse.ArgumentParser(description="converting a csv file to a table")
+    parser.add_argument("csv_files", nargs='+', metavar="csv_file",
+                        help="the csv file to convert, - to read from stdin. the tables of"
+                             " more than one file are written to files next to them")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--single-pass", action="store_true",
+                      help="read the file only once (always on for stdin and pipes)")
+    mode.add_argument("--jobs", type=int, default=1,
+                      help="check the file in this many processes, errors are reported with their line."
+                           " with more than one file, convert that many files at once")
+    mode.add_argument("--scanner", choices=[TEXT_SCANNER, MMAP_SCANNER], default=TEXT_SCANNER,
+                      help="mmap reads the fields straight from the bytes of a regular file")
+    mode.add_argument("--report-all", action="store_true",
+                      help="check the whole file and print every error as a json line instead of the table")
+    mode.add_argument("--widths", type=parsing_widths, default=None, metavar="X,Y",
+                      help="write the table while reading, with these widths of the second and third columns")
+    mode.add_argument("--sample", type=int, default=None, metavar="ROWS",
+                      help="write the table while reading, with the widths of the first ROWS rows")
+    mode.add_argument("--emit", choices=[TABLE_EMIT, BINARY_EMIT], default=TABLE_EMIT,
+                      help="binary packs every row into a record instead of writing the table")
+    mode.add_argument("--index", action="store_true",
+                      help="keep a sidecar index so a file that only grows is checked only from where it"
+                           " was checked before")
+    parser.add_argument("--index-file", default=None,
+                        help="with --index, the path of the index (the csv path with " + INDEX_SUFFIX + " if not given)")
+    parser.add_argument("--on-overflow", choices=[TRUNCATE, RERENDER], default=TRUNCATE,
+                        help="with --widths or --sample, cut a cell that is too long, or write the whole"
+                             " table again when the output is a regular file")
+    parser.add_argument("--max-errors", type=int, default=None,
+                        help="with --report-all, stop after this many errors")
+    parser.add_argument("--engine", choices=[ROW_ENGINE, NUMPY_ENGINE], default=ROW_ENGINE,
+                        help="numpy checks the rows in blocks of arrays")
+    parser.add_argument("--memory-budget", type=int, default=MEMORY_BUDGET,
+                        help="characters kept in memory in single pass mode before using a temp file")
+    parser.add_argument("--buffer-size", type=int, default=WRITE_BUFFER,
+                        help="how many characters of the table are written at once")
+    parser.add_argument("--direct", action="store_true",
+                        help="write the table straight to the stdout file descriptor, without the text layer")
+    parser.add_argument("--output-dir", default=None,
+                        help="with more than one file, where to write the tables (next to the files if not given)")
+    args = parser.parse_args(argv)
+    if len(args.csv_files) > 1 and (args.single_pass or args.report_all or args.scanner != TEXT_SCANNER
+                                    or args.engine != ROW_ENGINE or args.widths or args.sample or args.index
+                                    or args.emit != TABLE_EMIT):
+        parser.error(ERROR_ONE_FILE_MODE)
+    # the other modes don't use the engine
+    if args.engine != ROW_ENGINE and (args.jobs > 1 or args.single_pass or args.report_all
+                                      or args.scanner != TEXT_SCANNER or args.widths or args.sample
+                                      or args.index or args.emit != TABLE_EMIT or is_pipe(args.csv_files[0])):
+        parser.error(ERROR_ENGINE_WITH_MODE)
+    return args
+
+
+def converting(args):
+    """
+    converting one csv file the way the command line asked
+    :param args: the parsed arguments
+    """
+    path = args.csv_files[0]
+    sink = sys.stdout
+    if args.direct:
+        sys.stdout.flush()
+        sink = sys.stdout.fileno()
+    if args.emit == BINARY_EMIT:
+        source = sys.stdin if path == STDIN else path
+        writing_binary(source, sink if args.direct else sys.stdout.buffer, args.buffer_size)
+    elif args.report_all:
+        with opening_csv(path) as f:
+            errors = reporting_all(f, args.max_errors)
+        printing_errors(errors)
+        if errors:
+            sys.exit(ERROR_FOUND_ERRORS.format(len(errors)))
+    elif args.widths is not None or args.sample is not None:
+        with opening_csv(path) as f:
+            if args.widths is not None:
+                (x, y), sample = args.widths, ()
+            else:
+                x, y, sample = sampling_widths(f, args.sample)
+            try:
+                streaming_table(f, sink, x, y, args.on_overflow, sample, args.memory_budget, args.buffer_size)
+            except ValueError as error:
+                sys.exit(str(error))
+    elif args.jobs > 1:
+        if is_pipe(path):
+            sys.exit(ERROR_JOBS_WITH_PIPE)
+        x, y = parallel_legnth_columns(path, args.jobs)
+        with open(path, 'r') as f:
+            writing_lines(sink, itertools.chain(rendering_header(x, y), rendering_rows(f, x, y)), args.buffer_size)
+    elif args.index:
+        if is_pipe(path):
+            sys.exit(ERROR_INDEX_WITH_PIPE)
+        x, y = indexed_legnth_columns(path, args.index_file)
+        with open(path, 'r') as f:
+            writing_lines(sink, itertools.chain(rendering_header(x, y), rendering_rows(f, x, y)), args.buffer_size)
+    elif args.scanner == MMAP_SCANNER:
+        if is_pipe(path):
+            sys.exit(ERROR_MMAP_WITH_PIPE)
+        mmap_converting(path, sink, args.buffer_size)
+    elif path == STDIN:
+        writing_table(sys.stdin, sink, args.memory_budget, args.buffer_size)
+    elif args.single_pass or is_pipe(path):
+        with open(path, 'r') as f:
+            writing_table(f, sink, args.memory_budget, args.buffer_size)
+    elif args.engine == NUMPY_ENGINE:
+        if numpy is None:
+            sys.exit(ERROR_NO_NUMPY)
+        with open(path, 'r') as f:
+            x, y = numpy_legnth_columns(f)
+        with open(path, 'r') as f:
+            writing_lines(sink, itertools.chain(rendering_header(x, y), rendering_rows(f, x, y)), args.buffer_size)
+    else:
+        writing_table(path, sink, buffer_size=args.buffer_size)
+
+
+def writing_many(paths, jobs, output_dir):
+    """
+    converting many files with convert_many and writing every table to a file,
+    the files that could not be converted are reported and the exit code is 1
+    :param paths: the paths of the csv files
+    :param jobs: the number of worker processes
+    :param output_dir: where to write the tables, next to the csv files if None
+    """
+    failed = 0
+    for path, table, error in convert_many(paths, jobs):
+        if error is not None:
+            if isinstance(error, ConverterError):
+                error = ERROR_IN_LINE.format(error.line_number, error)
+            print(ERROR_IN_FILE.format(path, error), file=sys.stderr)
+            failed += 1
+            continue
+        table_path = os.path.splitext(path)[0] + TABLE_SUFFIX
+        if output_dir is not None:
+            table_path = os.path.join(output_dir, os.path.basename(table_path))
+        with open(table_path, 'w') as f:
+            f.write(table)
+    if failed:
+        sys.exit(ERROR_FAILED_FILES.format(failed))
+
+
+def main(argv=None):
+    args = parsing_arguments(argv)
+    if len(args.csv_files) > 1:
+        writing_many(args.csv_files, args.jobs, args.output_dir)
+        return
+    try:
+        converting(args)
+    except ConverterError as error:
+        if args.jobs > 1:
+            sys.exit(ERROR_IN_LINE.format(error.line_number, error))
+        sys.exit(str(error))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,234 @@
+#############################################################
+# FILE : benchmark.py
+# WRITER : Avi Kupinsky avikupinsky 318336070
+# EXERCISE : softwareTesting  ex1 2023
+#############################################################
+import argparse
+import contextlib
+import functools
+import json
+import locale
+import mmap
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import EX1_318336070 as ex1
+import generate_csv
+
+SIZES = "1000,100000"
+SEED = 0
+REPEAT = 3
+THRESHOLD = 0.2
+# the part of the rows with an error in the file of the report-all scan
+ERROR_RATIO = 0.01
+SCAN = "scan"
+RENDER = "render"
+CONVERT = "convert"
+
+
+def text_scan(path):
+    """
+    only the width scan of the converter, without printing
+    """
+    with open(path, 'r') as f:
+        ex1.finding_legnth_columns(f)
+
+
+def mmap_scan(path):
+    """
+    only the width scan of the mmap scanner, without printing
+    """
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        view = memoryview(buffer)
+        ex1.mmap_legnth_columns(buffer, view, locale.getpreferredencoding(False))
+        view.release()
+
+
+def numpy_scan(path):
+    """
+    only the width scan of the numpy engine, without printing
+    """
+    with open(path, 'r') as f:
+        ex1.numpy_legnth_columns(f)
+
+
+def report_all_scan(path):
+    """
+    collecting all the errors of a file that has errors
+    """
+    with open(path, 'r') as f:
+        ex1.reporting_all(f)
+
+
+def print_rows(path, x, y):
+    """
+    only the rows, with one print of joined ljust cells for every row like
+    the converter printed them before writing_lines
+    """
+    with open(path, 'r') as f:
+        for line in f:
+            elements = line.split(',')
+            if elements[ex1.FIRST_COLUM] == ex1.STRING_TYPE:
+                print(ex1.PIPE + ex1.STRING.ljust(len(ex1.INTEGER)) + ex1.PIPE + elements[ex1.SECOND_COLUM].ljust(x)
+                      + ex1.PIPE + elements[ex1.THIRD_COLUM].strip().ljust(y) + ex1.PIPE)
+            else:
+                print(ex1.PIPE + ex1.INTEGER.ljust(len(ex1.STRING)) + ex1.PIPE
+                      + (str(int(elements[ex1.SECOND_COLUM]) * ex1.BIT_LEGNTH) + ex1.BIT).ljust(x)
+                      + ex1.PIPE + elements[ex1.THIRD_COLUM].strip().ljust(y) + ex1.PIPE)
+
+
+def writer_rows(path, x, y, direct=False):
+    """
+    only the rows, with the templates and the chunks of writing_lines
+    :param direct: write to the file descriptor of stdout and not to the text layer
+    """
+    with open(path, 'r') as f:
+        ex1.writing_lines(sys.stdout.fileno() if direct else sys.stdout, ex1.rendering_rows(f, x, y))
+
+
+def text_convert(path):
+    """
+    the whole converter: checking the file and then writing the table
+    """
+    ex1.writing_table(path, sys.stdout)
+
+
+def measuring(function, repeat, memory):
+    """
+    running a function with stdout going to devnull, the time is taken without
+    tracemalloc and the allocations are taken in another run with it
+    :param function: the function to run, without arguments
+    :param repeat: how many times to take the time, the best one is kept
+    :param memory: whether to take the peak of the allocations
+    :return: the best time in seconds and the peak of the traced allocations in bytes (None without memory)
+    """
+    best = None
+    peak = None
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            function()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        if memory:
+            tracemalloc.start()
+            function()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+    return best, peak
+
+
+def benchmark_cases(path, invalid_path):
+    """
+    :param path: a valid csv file
+    :param invalid_path: a csv file with errors
+    :return: a list of (name, stage, function without arguments)
+    """
+    with open(path, 'r') as f:
+        x, y = ex1.finding_legnth_columns(f)
+    cases = [("text", SCAN, functools.partial(text_scan, path)),
+             ("mmap", SCAN, functools.partial(mmap_scan, path)),
+             ("report-all", SCAN, functools.partial(report_all_scan, invalid_path)),
+             ("print", RENDER, functools.partial(print_rows, path, x, y)),
+             ("writer", RENDER, functools.partial(writer_rows, path, x, y)),
+             ("writer fd", RENDER, functools.partial(writer_rows, path, x, y, direct=True)),
+             ("text", CONVERT, functools.partial(text_convert, path)),
+             ("mmap", CONVERT, functools.partial(ex1.mmap_converting, path))]
+    if ex1.numpy is not None:
+        cases.insert(2, ("numpy", SCAN, functools.partial(numpy_scan, path)))
+    return cases
+
+
+def running_suite(sizes, seed, repeat, memory, generator_options):
+    """
+    generating a valid file and a file with errors of every size and measuring every case on them
+    :param sizes: the numbers of rows
+    :param seed: the seed of the generated files
+    :param repeat: how many times to take the time of a case
+    :param memory: whether to take the peak of the allocations
+    :param generator_options: the arguments of generate_csv.generating_rows
+    :return: a list of results, a dict for every size and case
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for rows in sizes:
+            path = os.path.join(directory, f"valid_{rows}.csv")
+            invalid_path = os.path.join(directory, f"invalid_{rows}.csv")
+            generate_csv.writing_csv(path, rows, seed, **generator_options)
+            generate_csv.writing_csv(invalid_path, rows, seed, errors=max(1, int(rows * ERROR_RATIO)),
+                                     **generator_options)
+            for name, stage, function in benchmark_cases(path, invalid_path):
+                seconds, peak = measuring(function, repeat, memory)
+                result = {"rows": rows, "bytes": os.path.getsize(path), "name": name, "stage": stage,
+                          "seconds": seconds, "rows_per_second": rows / seconds, "peak_bytes": peak}
+                results.append(result)
+                printing_result(result)
+    return results
+
+
+def printing_result(result):
+    """
+    printing one result as a line of a table
+    """
+    peak = "" if result["peak_bytes"] is None else f"{result['peak_bytes']:12d} bytes peak"
+    print(f"{result['rows']:>9} rows {result['stage']:<8}{result['name']:<11}"
+          f"{result['seconds']:9.3f}s {result['rows_per_second']:12.0f} rows/s {peak}")
+
+
+def comparing(results, baseline, threshold):
+    """
+    finding the cases that got slower than in the baseline
+    :param results: the results of this run
+    :param baseline: the results of a run that was saved before
+    :param threshold: how much slower is a regression, 0.2 is 20%
+    :return: a list of (result, the seconds in the baseline)
+    """
+    before = {(result["rows"], result["stage"], result["name"]): result["seconds"] for result in baseline}
+    regressions = []
+    for result in results:
+        seconds = before.get((result["rows"], result["stage"], result["name"]))
+        if seconds is not None and result["seconds"] > seconds * (1 + threshold):
+            regressions.append((result, seconds))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="measuring the scan, the render and the memory of the converter"
+                                                 " on generated files")
+    parser.add_argument("--sizes", default=SIZES, help="the numbers of rows, with commas between them")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--no-memory", action="store_true", help="don't run again with tracemalloc")
+    parser.add_argument("--string-ratio", type=float, default=generate_csv.STRING_RATIO)
+    parser.add_argument("--max-string", type=int, default=generate_csv.MAX_STRING)
+    parser.add_argument("--max-bytes", type=int, default=generate_csv.MAX_BYTES)
+    parser.add_argument("--long-value-ratio", type=float, default=generate_csv.LONG_VALUE_RATIO)
+    parser.add_argument("--output", default=None, help="save the results to this json file")
+    parser.add_argument("--compare", default=None, help="a json file of results to compare with")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help="how much slower than the baseline is a regression")
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(',')]
+    generator_options = {"string_ratio": args.string_ratio, "max_string": args.max_string,
+                         "max_bytes": args.max_bytes, "long_value_ratio": args.long_value_ratio}
+    results = running_suite(sizes, args.seed, args.repeat, not args.no_memory, generator_options)
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump({"python": platform.python_version(), "machine": platform.machine(), "seed": args.seed,
+                       "generator": generator_options, "results": results}, f, indent=2)
+    if args.compare is not None:
+        with open(args.compare, 'r') as f:
+            regressions = comparing(results, json.load(f)["results"], args.threshold)
+        for result, seconds in regressions:
+            print(f"regression: {result['rows']} rows {result['stage']} {result['name']}"
+                  f" {seconds:.3f}s -> {result['seconds']:.3f}s")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
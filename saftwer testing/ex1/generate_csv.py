@@ -0,0 +1,138 @@
+#############################################################
+# FILE : generate_csv.py
+# WRITER : Avi Kupinsky avikupinsky 318336070
+# EXERCISE : softwareTesting  ex1 2023
+#############################################################
+import argparse
+import random
+import string
+import sys
+
+import EX1_318336070 as ex1
+
+ROWS = 1000
+SEED = 0
+STRING_RATIO = 0.5
+MAX_STRING = 40
+MAX_BYTES = 16
+LONG_VALUE_RATIO = 0.01
+LONG_STRING = 1000
+LETTERS = string.ascii_letters
+
+# the errors the generator can put in a row, by the ERROR_CODES of the converter
+ERROR_KINDS = ["STRING_LEGNTH", "POWER_TWO", "STRING_WITH_INTEGER", "INTEGER_WITH_STRING",
+               "NOT_ENOUGH_BYTES", "NOT_CURRENT_PARAMETERS", "FIRST_COLUM"]
+
+
+def byte_sizes(max_bytes):
+    """
+    :param max_bytes: the widest integer in bytes
+    :return: the legnths in bytes that give a power of 2 bits, up to max_bytes
+    """
+    sizes = []
+    size = 1
+    while size <= max_bytes:
+        sizes.append(size)
+        size *= 2
+    return sizes
+
+
+def string_row(generator, max_string, long_value_ratio):
+    """
+    :return: a valid string row
+    """
+    legnth = LONG_STRING if generator.random() < long_value_ratio else generator.randint(1, max_string)
+    value = ''.join(generator.choices(LETTERS, k=legnth))
+    return ex1.STRING_TYPE + ',' + str(legnth) + ',' + value
+
+
+def integer_row(generator, sizes):
+    """
+    :return: a valid integer row, its value uses all the bits of its size
+    """
+    size = generator.choice(sizes)
+    value = generator.getrandbits(size * ex1.BIT_LEGNTH)
+    return ex1.INTEGER_TYPE + ',' + str(size) + ',' + str(value)
+
+
+def error_row(generator, kind, sizes):
+    """
+    :param kind: one of ERROR_KINDS
+    :return: a row with that error
+    """
+    value = ''.join(generator.choices(LETTERS, k=generator.randint(1, 10)))
+    if kind == "STRING_LEGNTH":
+        return ex1.STRING_TYPE + ',' + str(len(value) + 1) + ',' + value
+    elif kind == "POWER_TWO":
+        return ex1.INTEGER_TYPE + ',3,1'
+    elif kind == "STRING_WITH_INTEGER":
+        return ex1.STRING_TYPE + ',3,123'
+    elif kind == "INTEGER_WITH_STRING":
+        return ex1.INTEGER_TYPE + ',1,' + value
+    elif kind == "NOT_ENOUGH_BYTES":
+        size = generator.choice(sizes)
+        return ex1.INTEGER_TYPE + ',' + str(size) + ',' + str(1 << (size * ex1.BIT_LEGNTH))
+    elif kind == "NOT_CURRENT_PARAMETERS":
+        return ex1.STRING_TYPE + ',' + str(len(value)) + ',' + value + ',' + value
+    return '3,' + str(len(value)) + ',' + value
+
+
+def generating_rows(rows, seed=SEED, string_ratio=STRING_RATIO, max_string=MAX_STRING, max_bytes=MAX_BYTES,
+                    long_value_ratio=LONG_VALUE_RATIO, errors=0):
+    """
+    generating the rows of a csv file, the same seed always gives the same rows
+    :param rows: the number of rows
+    :param seed: the seed of the random rows
+    :param string_ratio: the part of the rows that are strings
+    :param max_string: the longest usual string
+    :param max_bytes: the widest integer in bytes
+    :param long_value_ratio: the part of the string rows with a LONG_STRING value
+    :param errors: how many rows have an error, they are spread at random lines
+    :return: a generator of the lines, with a new line
+    """
+    generator = random.Random(seed)
+    sizes = byte_sizes(max_bytes)
+    error_lines = set(generator.sample(range(rows), min(errors, rows)))
+    for line in range(rows):
+        if line in error_lines:
+            row = error_row(generator, generator.choice(ERROR_KINDS), sizes)
+        elif generator.random() < string_ratio:
+            row = string_row(generator, max_string, long_value_ratio)
+        else:
+            row = integer_row(generator, sizes)
+        yield row + '\n'
+
+
+def writing_csv(path, rows, seed=SEED, **options):
+    """
+    writing a generated csv file
+    :param path: where to write the file, - for stdout
+    :param rows: the number of rows
+    :param seed: the seed of the random rows
+    :param options: the other arguments of generating_rows
+    """
+    if path == ex1.STDIN:
+        sys.stdout.writelines(generating_rows(rows, seed, **options))
+        return
+    with open(path, 'w') as f:
+        f.writelines(generating_rows(rows, seed, **options))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="generating csv files for the converter")
+    parser.add_argument("path", help="where to write the file, - for stdout")
+    parser.add_argument("--rows", type=int, default=ROWS)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--string-ratio", type=float, default=STRING_RATIO)
+    parser.add_argument("--max-string", type=int, default=MAX_STRING)
+    parser.add_argument("--max-bytes", type=int, default=MAX_BYTES, help="the widest integer in bytes")
+    parser.add_argument("--long-value-ratio", type=float, default=LONG_VALUE_RATIO,
+                        help="the part of the string rows with a value of " + str(LONG_STRING) + " characters")
+    parser.add_argument("--errors", type=int, default=0, help="how many rows have an error")
+    args = parser.parse_args()
+    writing_csv(args.path, args.rows, args.seed, string_ratio=args.string_ratio, max_string=args.max_string,
+                max_bytes=args.max_bytes, long_value_ratio=args.long_value_ratio, errors=args.errors)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+#############################################################
+# FILE : golden_runner.py
+# WRITER : Avi Kupinsky avikupinsky 318336070
+# EXERCISE : softwareTesting  ex1 2023
+#############################################################
+import argparse
+import difflib
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import EX1_318336070 as ex1
+
+CSV_SUFFIX = ".csv"
+EXPECTED_SUFFIX = ".out"
+PASS = "PASS"
+FAIL = "FAIL"
+ERROR_UNKNOWN_MESSAGE = "the expected error is not one of the errors in a row (ERROR_CODES of the converter)"
+ERROR_NO_CASES = "no csv files with an expected " + EXPECTED_SUFFIX + " file were found"
+ERROR_FAILED_CASES = "{} of {} cases failed"
+
+# the messages of the errors in a row, an expected file with one of them expects the file to fail with it
+ERROR_MESSAGES = set(ex1.ERROR_CODES)
+
+
+def finding_cases(directories):
+    """
+    finding every csv file that has an expected file next to it
+    :param directories: the directories to look in, with their sub directories
+    :return: a sorted list of (csv path, expected path)
+    """
+    cases = []
+    for directory in directories:
+        for csv_path in glob.glob(os.path.join(glob.escape(directory), "**", "*" + CSV_SUFFIX), recursive=True):
+            expected_path = os.path.splitext(csv_path)[0] + EXPECTED_SUFFIX
+            if os.path.isfile(expected_path):
+                cases.append((csv_path, expected_path))
+    return sorted(cases)
+
+
+def converting_case(csv_path):
+    """
+    converting one csv file in this process, the way the command line shows it
+    :param csv_path: the path of the csv file
+    :return: the table, or the error message with a new line like it is printed by sys.exit
+    """
+    _, table, error = ex1.converting_file(csv_path)
+    if error is not None:
+        return str(error) + ex1.NEW_LINE
+    return table
+
+
+def running_case(case):
+    """
+    converting one csv file and comparing it with its expected file, in a worker of the pool
+    :param case: (csv path, expected path)
+    :return: the csv path, PASS or FAIL, the seconds the conversion took and the lines of the diff
+    """
+    csv_path, expected_path = case
+    with open(expected_path, 'r') as f:
+        expected = f.read()
+    start = time.perf_counter()
+    actual = converting_case(csv_path)
+    seconds = time.perf_counter() - start
+    if actual == expected:
+        return csv_path, PASS, seconds, []
+    diff = list(difflib.unified_diff(expected.splitlines(keepends=True), actual.splitlines(keepends=True),
+                                     expected_path, csv_path))
+    # an expected file without a table is an error message, it should be one the converter has
+    if ex1.PIPE not in expected and expected.strip() not in ERROR_MESSAGES:
+        diff.append(ERROR_UNKNOWN_MESSAGE + ex1.NEW_LINE)
+    return csv_path, FAIL, seconds, diff
+
+
+def running_cases(cases, jobs):
+    """
+    running the cases in a pool of worker processes, the results come back in the order of the cases
+    as soon as they are ready
+    :param cases: a list of (csv path, expected path)
+    :param jobs: the number of worker processes, 1 to run here
+    :return: a generator of the results of running_case
+    """
+    if jobs <= 1:
+        yield from map(running_case, cases)
+        return
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        yield from pool.map(running_case, cases, chunksize=max(1, len(cases) // (jobs * 4)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="converting every csv file that has an expected " + EXPECTED_SUFFIX
+                                                 + " file and comparing the table or the error with it")
+    parser.add_argument("directories", nargs='+', metavar="directory", help="where to look for the cases")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="the number of worker processes")
+    parser.add_argument("--quiet", action="store_true", help="print only the failed cases and the summary")
+    args = parser.parse_args()
+    cases = finding_cases(args.directories)
+    if not cases:
+        sys.exit(ERROR_NO_CASES)
+    start = time.perf_counter()
+    failed = 0
+    total_seconds = 0
+    for csv_path, result, seconds, diff in running_cases(cases, args.jobs):
+        total_seconds += seconds
+        if result == FAIL:
+            failed += 1
+        if result == FAIL or not args.quiet:
+            print(f"{result} {seconds * 1000:8.2f}ms {csv_path}")
+        sys.stdout.writelines(diff)
+        sys.stdout.flush()
+    wall = time.perf_counter() - start
+    print(f"{len(cases) - failed} passed, {failed} failed in {wall:.3f}s ({total_seconds:.3f}s converting)")
+    if failed:
+        sys.exit(ERROR_FAILED_CASES.format(failed, len(cases)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,273 @@
+""" Tests for the EX1 converter"""
+
+import io
+import json
+import mmap
+import os
+import sys
+
+import pytest
+
+# Makes it easier to run in students' Windows's laptops, with no need to set path vars
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import EX1_318336070 as ex1
+
+
+ROWS = ["1,3,abc\n", "2,1,200\n", "1,5,hello\n", "2,8,18446744073709551615\n"]
+
+
+@pytest.fixture
+def binary_file(tmp_path):
+    csv_path = tmp_path / "rows.csv"
+    csv_path.write_text(''.join(ROWS))
+    binary_path = tmp_path / "rows.bin"
+    with open(binary_path, 'wb') as f:
+        ex1.writing_binary(str(csv_path), f)
+    return str(binary_path)
+
+
+# ---------------------------------------------------------------------------
+# --emit binary: the rows read back are the rows that were written
+# ---------------------------------------------------------------------------
+def test_reading_binary(binary_file):
+    rows = list(ex1.reading_binary(binary_file))
+    assert rows == [(ex1.STRING_TYPE, 3, "abc"), (ex1.INTEGER_TYPE, 1, 200),
+                    (ex1.STRING_TYPE, 5, "hello"), (ex1.INTEGER_TYPE, 8, (1 << 64) - 1)]
+
+
+# ---------------------------------------------------------------------------
+# a reader that is stopped in the middle of the file closes the mmap without an error
+# ---------------------------------------------------------------------------
+def test_reading_binary_stopped_early(binary_file):
+    for row in ex1.reading_binary(binary_file):
+        break
+    assert row == (ex1.STRING_TYPE, 3, "abc")
+
+    rows = ex1.reading_binary(binary_file)
+    next(rows)
+    next(rows)
+    rows.close()
+
+
+def test_reading_binary_not_binary(tmp_path):
+    csv_path = tmp_path / "rows.csv"
+    csv_path.write_text(''.join(ROWS))
+    with pytest.raises(ValueError):
+        list(ex1.reading_binary(str(csv_path)))
+
+
+# ---------------------------------------------------------------------------
+# convert_many: a file that can't be read is the error of that file only
+# ---------------------------------------------------------------------------
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_convert_many_missing_file(tmp_path, jobs):
+    csv_path = tmp_path / "rows.csv"
+    csv_path.write_text(''.join(ROWS))
+    undecodable_path = tmp_path / "undecodable.csv"
+    undecodable_path.write_bytes(b"1,3,\xff\xfe\n")
+    missing_path = str(tmp_path / "missing.csv")
+    results = ex1.convert_many([str(csv_path), missing_path, str(undecodable_path)], jobs)
+    assert results[0][1] is not None and results[0][2] is None
+    assert results[1][1] is None and isinstance(results[1][2], FileNotFoundError)
+    assert results[2][1] is None and isinstance(results[2][2], UnicodeDecodeError)
+
+
+# ---------------------------------------------------------------------------
+# --widths and --sample: the header and the first row are flushed before the next row is read,
+# and every row of a pipe is
+# ---------------------------------------------------------------------------
+class RecordingSink:
+    def __init__(self):
+        self.events = []
+
+    def write(self, data):
+        self.events.append(data)
+
+    def flush(self):
+        self.events.append(None)
+
+
+def test_streaming_table_flushes_first_row(tmp_path):
+    csv_path = tmp_path / "rows.csv"
+    csv_path.write_text(''.join(ROWS))
+    sink = RecordingSink()
+    with open(csv_path, 'r') as f:
+        ex1.streaming_table(f, sink, 6, 30)
+    assert sink.events[1] is None and sink.events[3] is None
+    assert sink.events[2].count(ex1.NEW_LINE) == 1 and sink.events[4].count(ex1.NEW_LINE) == len(ROWS) - 1
+
+
+def test_streaming_table_flushes_pipe_rows():
+    read_end, write_end = os.pipe()
+    with os.fdopen(write_end, 'w') as f:
+        f.write(''.join(ROWS))
+    sink = RecordingSink()
+    with os.fdopen(read_end, 'r') as f:
+        ex1.streaming_table(f, sink, 6, 30)
+    # the header, then every row on its own, each one flushed
+    assert sink.events[1::2] == [None] * (len(ROWS) + 1)
+    assert [data.count(ex1.NEW_LINE) for data in sink.events[0::2]] == [2] + [1] * len(ROWS)
+
+
+# ---------------------------------------------------------------------------
+# --on-overflow rerender: a sink that can't be written again is an error, not an exit
+# ---------------------------------------------------------------------------
+def test_streaming_table_rerender_not_seekable():
+    read_end, write_end = os.pipe()
+    try:
+        with pytest.raises(ValueError, match=ex1.ERROR_RERENDER_NOT_SEEKABLE):
+            ex1.streaming_table(iter(ROWS), write_end, 2, 2, ex1.RERENDER)
+    finally:
+        os.close(read_end)
+        os.close(write_end)
+
+
+# ---------------------------------------------------------------------------
+# --engine numpy: a '\0' at the end of a field is the same error as in the row engine
+# ---------------------------------------------------------------------------
+# ---------------------------------------------------------------------------
+# --scanner mmap: the rows end where the lines of a file opened with 'r' end
+# ---------------------------------------------------------------------------
+@pytest.mark.parametrize("text", ["1,3,abc\r2,1,200\r", "1,3,abc\r2,1,200\n1,2,xy\r\n2,1,7",
+                                  "1,3,abc\r\n2,1,200\r\n", "1,3,abc\n2,1,200"])
+def test_mmap_scanner_line_ends(tmp_path, text):
+    csv_path = tmp_path / "rows.csv"
+    csv_path.write_bytes(text.encode())
+    expected = io.StringIO()
+    ex1.writing_table(str(csv_path), expected)
+    actual = io.StringIO()
+    ex1.mmap_converting(str(csv_path), actual)
+    assert actual.getvalue() == expected.getvalue()
+
+
+@pytest.mark.parametrize("text", ["1,3,abc\r2,3,200\r1,2,xy\r", "1,3,abc\r\n2,1,200\r1,2,x\n",
+                                  "".join(ROWS) * 3 + "2,1,256\n" + "".join(ROWS)])
+def test_mmap_scanner_errors(tmp_path, text):
+    csv_path = tmp_path / "rows.csv"
+    csv_path.write_bytes(text.encode())
+    with open(csv_path, 'r') as f, pytest.raises(ex1.ConverterError) as row_error:
+        ex1.finding_legnth_columns(f)
+    with pytest.raises(ex1.ConverterError) as error:
+        ex1.mmap_converting(str(csv_path), io.StringIO())
+    assert (error.value.error, error.value.line_number) == (row_error.value.error, row_error.value.line_number)
+    for block_size in (1, 16, ex1.READ_CHUNK):
+        with open(csv_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            view = memoryview(buffer)
+            with pytest.raises(ex1.ConverterError) as error:
+                ex1.mmap_legnth_columns(buffer, view, 'utf-8', block_size)
+            view.release()
+        assert (error.value.error, error.value.line_number) == (row_error.value.error, row_error.value.line_number)
+
+
+# ---------------------------------------------------------------------------
+# --engine numpy: a block of good rows is checked as arrays, with the widths of the row engine
+# ---------------------------------------------------------------------------
+@pytest.mark.parametrize("block_size", [1, 7, ex1.READ_CHUNK])
+def test_numpy_engine_widths(block_size):
+    pytest.importorskip("numpy")
+    rows = ROWS + ["2,16,340282366920938463463374607431768211455\n", "1,0,\n", "1,11,hello world"]
+    assert ex1.vector_checking_block(''.join(ROWS)) == ex1.finding_legnth_columns(ROWS)
+    assert ex1.numpy_legnth_columns(io.StringIO(''.join(rows)), block_size) == ex1.finding_legnth_columns(rows)
+
+
+@pytest.mark.parametrize("line", ["2,1,256\n", "2,3,1\n", "1,4,abc\n", "1,3,123\n", "2,1,7 x\n", "2,1,7,\n"])
+def test_numpy_engine_errors(line):
+    pytest.importorskip("numpy")
+    text = ''.join(ROWS) + line + ''.join(ROWS)
+    with pytest.raises(ex1.ConverterError) as row_error:
+        ex1.finding_legnth_columns(io.StringIO(text))
+    for block_size in (5, ex1.READ_CHUNK):
+        with pytest.raises(ex1.ConverterError) as error:
+            ex1.numpy_legnth_columns(io.StringIO(text), block_size)
+        assert (error.value.error, error.value.line_number) == (row_error.value.error, row_error.value.line_number)
+
+
+@pytest.mark.parametrize("line", ["2,8\0,200\n", "2,1,7\0\n"])
+def test_numpy_engine_null_character(line):
+    pytest.importorskip("numpy")
+    assert ex1.vector_checking_block(''.join(ROWS) + line) is None
+    with pytest.raises(ex1.ConverterError) as row_error:
+        ex1.finding_legnth_columns(ROWS + [line])
+    with pytest.raises(ex1.ConverterError) as error:
+        ex1.numpy_legnth_columns(io.StringIO(''.join(ROWS) + line))
+    assert (error.value.error, error.value.line_number) == (row_error.value.error, len(ROWS) + 1)
+
+
+@pytest.mark.parametrize("mode", [["--jobs", "2"], ["--single-pass"], ["--index"], ["--scanner", "mmap"]])
+def test_numpy_engine_with_mode(tmp_path, mode, capsys):
+    csv_path = tmp_path / "rows.csv"
+    csv_path.write_text(''.join(ROWS))
+    with pytest.raises(SystemExit):
+        ex1.parsing_arguments([str(csv_path), "--engine", "numpy"] + mode)
+    assert ex1.ERROR_ENGINE_WITH_MODE in capsys.readouterr().err
+
+
+# ---------------------------------------------------------------------------
+# --index: only the tail that was added since the last run is checked
+# ---------------------------------------------------------------------------
+@pytest.fixture
+def indexed_file(tmp_path):
+    csv_path = tmp_path / "rows.csv"
+    csv_path.write_text(''.join(ROWS))
+    assert ex1.indexed_legnth_columns(str(csv_path)) == ex1.finding_legnth_columns(ROWS)
+    return csv_path
+
+
+def reading_index_file(csv_path):
+    with open(str(csv_path) + ex1.INDEX_SUFFIX, 'r') as f:
+        return json.load(f)
+
+
+def changing_index_widths(csv_path, widths):
+    # widths that no row has, a result with them came from the index and not from the rows
+    index = reading_index_file(csv_path)
+    index["widths"] = widths
+    ex1.writing_index(str(csv_path) + ex1.INDEX_SUFFIX, index)
+
+
+def test_index_appended_rows(indexed_file):
+    index = reading_index_file(indexed_file)
+    assert (index["offset"], index["lines"]) == (indexed_file.stat().st_size, len(ROWS))
+    changing_index_widths(indexed_file, [50, 60])
+    with open(indexed_file, 'a') as f:
+        f.write("1,70," + "a" * 70 + "\n")
+    assert ex1.indexed_legnth_columns(str(indexed_file)) == (50, 70)
+    index = reading_index_file(indexed_file)
+    assert (index["offset"], index["lines"], index["widths"]) == (indexed_file.stat().st_size, len(ROWS) + 1, [50, 70])
+
+
+def test_index_appended_error(indexed_file):
+    with open(indexed_file, 'a') as f:
+        f.write("1,3,abc\n2,1,256\n")
+    with pytest.raises(ex1.ConverterError) as error:
+        ex1.indexed_legnth_columns(str(indexed_file))
+    assert (error.value.error, error.value.line_number) == (ex1.ERROR_NOT_ENOUGH_BYTES, len(ROWS) + 2)
+
+
+def test_index_changed_prefix(indexed_file):
+    changing_index_widths(indexed_file, [50, 60])
+    indexed_file.write_text(''.join(ROWS).replace("abc", "xyz"))
+    assert ex1.indexed_legnth_columns(str(indexed_file)) == ex1.finding_legnth_columns(ROWS)
+
+
+def test_index_truncated_file(indexed_file):
+    changing_index_widths(indexed_file, [50, 60])
+    indexed_file.write_text(''.join(ROWS[:2]))
+    assert ex1.indexed_legnth_columns(str(indexed_file)) == ex1.finding_legnth_columns(ROWS[:2])
+    index = reading_index_file(indexed_file)
+    assert (index["offset"], index["lines"]) == (indexed_file.stat().st_size, 2)
+
+
+def test_index_unfinished_last_line(indexed_file):
+    with open(indexed_file, 'a') as f:
+        f.write("1,12,hello")
+    with pytest.raises(ex1.ConverterError) as error:
+        ex1.indexed_legnth_columns(str(indexed_file))
+    assert (error.value.error, error.value.line_number) == (ex1.ERROR_STRING_LEGNTH, len(ROWS) + 1)
+    # the unfinished line is not in the index, the next run checks it again when it is done
+    index = reading_index_file(indexed_file)
+    assert (index["offset"], index["lines"]) == (len(''.join(ROWS)), len(ROWS))
+    with open(indexed_file, 'a') as f:
+        f.write(" world!\n")
+    assert ex1.indexed_legnth_columns(str(indexed_file)) == ex1.finding_legnth_columns(ROWS + ["1,12,hello world!\n"])
+    assert reading_index_file(indexed_file)["offset"] == indexed_file.stat().st_size
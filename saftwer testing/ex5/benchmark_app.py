@@ -0,0 +1,175 @@
+import argparse
+import datetime
+import inspect
+import json
+import os
+import re
+import sys
+import time
+
+from fastapi.routing import APIRoute
+from fastapi.testclient import TestClient
+
+# Makes it easier to run in students' Windows's laptops, with no need to set path vars
+sys.path.append(os.path.dirname(os.path.abspath(__name__)))
+import main
+import extra
+
+ITERATIONS = 1000
+WARMUP = 50
+THRESHOLD = 0.2
+SAMPLE_STRING = "benchmarking"
+# the integer parameters of a route take these in order, so a start comes before an end and both fit in the string
+SAMPLE_INTEGERS = (4, 8, 12)
+# the routes whose parameters can't be guessed from their types, with the routes to call before each call.
+# the sequences are the ones test_storage goes through: stop is StandBy, an add after it is Input,
+# five adds are Query, so an add or a query never sees a full storage and stays out of its Error state
+FIVE_WORDS = tuple(f"/storage/add?string=word{number}" for number in range(1, 6))
+KNOWN_ROUTES = {
+    "/upper/word": (),
+    "/time": (),
+    "/storage/add?string=bench": ("/storage/stop",),
+    "/storage/query?index=1": ("/storage/stop",) + FIVE_WORDS,
+    "/storage/state": (),
+}
+
+
+def filling_route(route):
+    # the path of a route with its path parameters and the query parameters with no default set to sample values,
+    # None when a parameter has a type with no sample value. the types come from the function of the route,
+    # the fields of fastapi keep them differently in every version
+    path = route.path
+    query = []
+    integers = iter(SAMPLE_INTEGERS)
+    for parameter in inspect.signature(route.endpoint).parameters.values():
+        in_path = parameter.name in route.param_convertors
+        if not in_path and parameter.default is not inspect.Parameter.empty:
+            continue
+        if parameter.annotation is int:
+            value = next(integers, None)
+        elif parameter.annotation is str:
+            value = SAMPLE_STRING
+        else:
+            value = None
+        if value is None:
+            return None
+        if in_path:
+            path = re.sub(r'{%s(:\w+)?}' % re.escape(parameter.name), str(value), path)
+        else:
+            query.append(f"{parameter.name}={value}")
+    if '{' in path:
+        return None
+    return path + ('?' + '&'.join(query) if query else '')
+
+
+def finding_routes(app):
+    # every GET route of the app with sample values for its parameters, and the known routes,
+    # a route a known route already calls isn't added again. also returns the routes that were skipped and why
+    routes = dict(KNOWN_ROUTES)
+    known_paths = [known.split('?')[0] for known in KNOWN_ROUTES]
+    skipped = []
+    for route in app.routes:
+        if not isinstance(route, APIRoute):
+            continue
+        if any(route.path_regex.match(known) for known in known_paths):
+            continue
+        if 'GET' not in route.methods:
+            skipped.append((route.path, "not a GET route"))
+            continue
+        path = filling_route(route)
+        if path is None:
+            skipped.append((route.path, "a parameter with no sample value"))
+        else:
+            routes.setdefault(path, ())
+    return routes, skipped
+
+
+def percentile(ordered, rank):
+    # nearest rank percentile of a sorted list
+    return ordered[max(0, -(-len(ordered) * rank // 100) - 1)]
+
+
+def measuring_route(client, route, setup, iterations, warmup):
+    # calling a route in the process through the asgi app, only the call itself is timed
+    for _ in range(warmup):
+        for setup_route in setup:
+            client.get(setup_route)
+        client.get(route)
+    seconds = []
+    for _ in range(iterations):
+        for setup_route in setup:
+            client.get(setup_route)
+        start = time.perf_counter()
+        response = client.get(route)
+        seconds.append(time.perf_counter() - start)
+    ordered = sorted(seconds)
+    # the status of the last call, a route that answers with an error is timing its error path
+    return {"route": route, "status": response.status_code, "iterations": iterations,
+            "requests_per_second": iterations / sum(seconds),
+            "p50": percentile(ordered, 50), "p99": percentile(ordered, 99), "max": ordered[-1]}
+
+
+def printing_result(result):
+    print(f"{result['route']:<40}{result['requests_per_second']:10.0f} req/s  p50 {result['p50'] * 1000:7.3f}ms"
+          f"  p99 {result['p99'] * 1000:7.3f}ms  max {result['max'] * 1000:7.3f}ms"
+          + ("" if result['status'] == 200 else f"  status {result['status']}"))
+
+
+def comparing(results, baseline, threshold):
+    # the routes whose p50 or p99 got slower than in the baseline by more than the threshold, 0.2 is 20%
+    before = {result["route"]: result for result in baseline}
+    regressions = []
+    for result in results:
+        if result["route"] not in before:
+            continue
+        for name in ("p50", "p99"):
+            if result[name] > before[result["route"]][name] * (1 + threshold):
+                regressions.append((result["route"], name, before[result["route"]][name], result[name]))
+    return regressions
+
+
+def main_benchmark():
+    parser = argparse.ArgumentParser(description="measuring the latency of the routes of main.app in the process")
+    parser.add_argument("--iterations", type=int, default=ITERATIONS, help="how many calls of every route are timed")
+    parser.add_argument("--warmup", type=int, default=WARMUP, help="calls of every route before the timing")
+    parser.add_argument("--route", action="append", default=None,
+                        help="measure only this route, can be given more than once (like /upper/word)")
+    parser.add_argument("--network", action="store_true",
+                        help="let /time ask the network, without it extra.get_network_time is the local clock")
+    parser.add_argument("--output", default=None, help="save the results to this json file")
+    parser.add_argument("--compare", default=None, help="a json file of results to compare with")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help="how much slower than the baseline is a regression")
+    args = parser.parse_args()
+    if not args.network:
+        extra.get_network_time = datetime.datetime.now
+
+    client = TestClient(main.app)
+    routes, skipped = finding_routes(main.app)
+    if args.route is not None:
+        routes = {route: routes.get(route, ()) for route in args.route}
+    else:
+        for path, reason in skipped:
+            print(f"skipped {path}: {reason}")
+    results = []
+    for route, setup in routes.items():
+        result = measuring_route(client, route, setup, args.iterations, args.warmup)
+        results.append(result)
+        printing_result(result)
+    slowest = max(results, key=lambda result: result["p99"])
+    print(f"the slowest route is {slowest['route']}")
+
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump({"results": results}, f, indent=2)
+    if args.compare is not None:
+        with open(args.compare, 'r') as f:
+            regressions = comparing(results, json.load(f)["results"], args.threshold)
+        for route, name, before, after in regressions:
+            print(f"regression: {route} {name} {before * 1000:.3f}ms -> {after * 1000:.3f}ms")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main_benchmark()
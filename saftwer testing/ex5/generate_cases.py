@@ -0,0 +1,112 @@
+import argparse
+import csv
+import importlib
+import itertools
+import random
+import sys
+
+CARS = 'small'
+FLAGS = ['ABS', 'ESP', 'FCW', 'LDW']
+BOOLEANS = ['TRUE', 'FALSE']
+STRENGTH = 2
+CANDIDATES = 20
+SEED = 0
+
+
+def uncovered_tuples(domains, strength):
+    # every t columns with every mix of their values, as ((column, value), ...) in the order of the columns
+    uncovered = set()
+    for columns in itertools.combinations(range(len(domains)), strength):
+        for values in itertools.product(*(domains[column] for column in columns)):
+            uncovered.add(tuple(zip(columns, values)))
+    return uncovered
+
+
+def new_tuples(row, column, value, strength, uncovered):
+    # how many uncovered tuples the value covers together with the columns of the row that have a value
+    count = 0
+    assigned = [other for other in range(len(row)) if row[other] is not None and other != column]
+    for others in itertools.combinations(assigned, strength - 1):
+        interaction = tuple(sorted([(other, row[other]) for other in others] + [(column, value)]))
+        if interaction in uncovered:
+            count += 1
+    return count
+
+
+def candidate_row(domains, strength, uncovered, generator):
+    # a row that starts from an uncovered tuple, the other columns get the value that covers the most
+    # new tuples with the columns before them, in a random order
+    row = [None] * len(domains)
+    for column, value in generator.choice(sorted(uncovered)):
+        row[column] = value
+    columns = [column for column in range(len(domains)) if row[column] is None]
+    generator.shuffle(columns)
+    for column in columns:
+        scores = [(new_tuples(row, column, value, strength, uncovered), value) for value in domains[column]]
+        best = max(score for score, _ in scores)
+        row[column] = generator.choice([value for score, value in scores if score == best])
+    return row
+
+
+def covered_by(row, strength):
+    return {tuple(zip(columns, (row[column] for column in columns)))
+            for columns in itertools.combinations(range(len(row)), strength)}
+
+
+def covering_rows(domains, strength=STRENGTH, candidates=CANDIDATES, seed=SEED):
+    # a greedy covering array: every row is the best of a few candidates, until every mix of values
+    # of every t columns is in some row. the same seed always gives the same rows
+    strength = min(strength, len(domains))
+    generator = random.Random(seed)
+    uncovered = uncovered_tuples(domains, strength)
+    rows = []
+    while uncovered:
+        best = max((candidate_row(domains, strength, uncovered, generator) for _ in range(candidates)),
+                   key=lambda row: len(covered_by(row, strength) & uncovered))
+        uncovered -= covered_by(best, strength)
+        rows.append(best)
+    return rows
+
+
+def loading_oracle(target):
+    # a python function given as module:function, it gets a row as a dict and returns the expected price
+    module_name, _, function_name = target.partition(':')
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def writing_cases(csv_file, columns, rows, oracle=None):
+    writer = csv.writer(csv_file, lineterminator='\n')
+    writer.writerow(columns + ['Expected'])
+    for row in rows:
+        expected = '' if oracle is None else oracle(dict(zip(columns, row)))
+        writer.writerow(row + [expected])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="writing a data.csv with every mix of values of every t columns"
+                                                 " in as few rows as it can")
+    parser.add_argument('path', help="where to write the cases, - for stdout")
+    parser.add_argument('--cars', default=CARS, help="the cars, with commas between them")
+    parser.add_argument('--flag', action='append', default=[], help="another TRUE/FALSE column after " +
+                                                                       ', '.join(FLAGS))
+    parser.add_argument('--strength', type=int, default=STRENGTH, help="t, 2 covers every pair of columns")
+    parser.add_argument('--candidates', type=int, default=CANDIDATES,
+                        help="how many rows are tried for every row that is kept")
+    parser.add_argument('--seed', type=int, default=SEED)
+    parser.add_argument('--oracle', metavar='MODULE:FUNCTION',
+                        help="a function that gets a row as a dict and returns the Expected price")
+    args = parser.parse_args()
+    columns = ['car'] + FLAGS + args.flag
+    domains = [args.cars.split(',')] + [BOOLEANS] * (len(columns) - 1)
+    rows = covering_rows(domains, args.strength, args.candidates, args.seed)
+    oracle = None if args.oracle is None else loading_oracle(args.oracle)
+    if args.path == '-':
+        writing_cases(sys.stdout, columns, rows, oracle)
+    else:
+        with open(args.path, mode='w', newline='') as f:
+            writing_cases(f, columns, rows, oracle)
+    print(f"{len(rows)} cases instead of {len(domains[0]) * 2 ** (len(columns) - 1)}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
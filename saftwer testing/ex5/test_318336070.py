@@ -5,6 +5,7 @@ import sys
 import json
 import random
 import datetime
+import importlib
 
 
 import fastapi.exceptions
@@ -63,6 +64,17 @@ def teardown_function():
     # For example, release handles
 
 
+# A fixture prepares something for the tests that ask for it by name, and cleans it after them.
+#   Reloading main makes a new app with a new StateMachine, so every storage test starts
+#   with an empty storage and nothing carries over from the tests that ran before it.
+#   That way the storage tests can run in any order, and on many cores (pytest -n auto with pytest-xdist).
+@pytest.fixture
+def storage_client():
+    importlib.reload(main)
+    with TestClient(main.app) as storage:
+        yield storage
+
+
 # ---------------------------------------------------------------------------
 # TEST 1: Transform a text to lowercase. Simple!
 # Amounts to 1 test in the total unit tests
@@ -482,7 +494,9 @@ def test_server_time_client(monkeypatch):
 #       - A function you invent that will mock update_db and update a flag for pass/fail (can be global)
 # ---------------------------------------------------------------------------
 db_update_called = False
-def test_storage_db(monkeypatch):
+def test_storage_db(monkeypatch, storage_client):
+    global db_update_called
+    db_update_called = False
 
     def check_update_db(a_db, value):
         global db_update_called
@@ -496,7 +510,7 @@ def test_storage_db(monkeypatch):
             db_update_called = False
 
     monkeypatch.setattr(extra, "update_db", check_update_db)
-    response = client.get("/storage/add?string=qwert")
+    response = storage_client.get("/storage/add?string=qwert")
     assert response.status_code == 200
     assert db_update_called is True
 
@@ -514,7 +528,7 @@ def test_storage_db(monkeypatch):
 #   Hint: It is recommended to use:
 #       - fastapi's "TestClient" to run the REST API via a client (it keeps the session alive).
 # ---------------------------------------------------------------------------
-def adding_five_words():
+def adding_five_words(client):
     response = client.get("/storage/add?string=first_word")
     response = client.get("/storage/add?string=second_word")
     response = client.get("/storage/add?string=third_word")
@@ -522,7 +536,8 @@ def adding_five_words():
     response = client.get("/storage/add?string=fifth_word")
     return response
 
-def test_storage():
+def test_storage(storage_client):
+    client = storage_client
     # where in input mode but we did not add anything
     response = client.get("/storage/add")
     assert response.json()["res"] == "Ok"
@@ -543,7 +558,7 @@ def test_storage():
     assert response.json()["res"].split()[1][:-1] == "StandBy"
 
     # adding 5 words and checking that it finds all the words
-    response = adding_five_words()
+    response = adding_five_words(client)
     assert response.json()["res"] == "Ok"
     response = client.get("/storage/query?index=1")
     assert response.json()["res"] == "first_word"
@@ -564,7 +579,7 @@ def test_storage():
     assert response.json()["res"].split()[1][:-1] == "Input"
 
 
-    response = adding_five_words()
+    response = adding_five_words(client)
     response = client.get("/storage/state")
     assert response.json()["res"].split()[1][:-1] == "Query"
 
@@ -589,7 +604,7 @@ def test_storage():
     response = client.get("/storage/state")
     assert response.json()["res"].split()[1][:-1] == "Input"
 
-    response = adding_five_words()
+    response = adding_five_words(client)
     response = client.get("/storage/state")
     assert response.json()["res"].split()[1][:-1] == "Query"
     response = client.get("/storage/stop")
@@ -597,7 +612,7 @@ def test_storage():
     response = client.get("/storage/state")
     assert response.json()["res"].split()[1][:-1] == "StandBy"
 
-    response = adding_five_words()
+    response = adding_five_words(client)
     response = client.get("/storage/query?index=6")
     assert response.json()["res"] == "Error"
     response = client.get("/storage/state")
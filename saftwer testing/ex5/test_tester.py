@@ -0,0 +1,209 @@
+""" Tests for tester.py, with a python function in place of car_pricing.exe"""
+
+import csv
+import json
+import os
+import sys
+import xml.etree.ElementTree
+
+import pytest
+
+# Makes it easier to run in students' Windows's laptops, with no need to set path vars
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import tester
+
+COLUMNS = ['car', 'ABS', 'ESP', 'FCW', 'LDW', 'Expected']
+# the stand-in program: the price is 100 and 10 for every argument, every call is kept in CALLS
+PRICER = '''CALLS = []
+
+
+def pricing(arguments):
+    CALLS.append(arguments)
+    return 100 + 10 * len(arguments)
+'''
+
+
+@pytest.fixture
+def pricer(tmp_path, monkeypatch):
+    # a new module for every test, so the calls and the hash of its file start over
+    (tmp_path / 'pricer.py').write_text(PRICER)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.delitem(sys.modules, 'pricer', raising=False)
+    monkeypatch.chdir(tmp_path)
+    backend = tester.CallableBackend('pricer:pricing')
+    return backend, sys.modules['pricer']
+
+
+def writing_data(path, rows):
+    # rows of (car, abs, expected), the other flags are FALSE
+    with open(path, mode='w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        for car, abs_flag, expected in rows:
+            writer.writerow([car, abs_flag, 'FALSE', 'FALSE', 'FALSE', expected])
+
+
+def making_test(car, abs_flag='FALSE', expected='120'):
+    return {'car': car, 'abs': abs_flag, 'esp': 'FALSE', 'fcw': 'FALSE', 'ldw': 'FALSE', 'expected': expected}
+
+
+def running_main(monkeypatch, *arguments):
+    monkeypatch.setattr(sys, 'argv', ['tester.py', '--backend', 'callable', '--callable', 'pricer:pricing']
+                        + list(arguments))
+    tester.main()
+
+
+# ---------------------------------------------------------------------------
+# tests with the same arguments run the program once
+# ---------------------------------------------------------------------------
+def test_duplicate_arguments(pricer):
+    backend, module = pricer
+    cases = enumerate([making_test('small'), making_test('big'), making_test('small', expected='999')])
+    results = list(tester.running_tests(cases, backend, None, 2, 1))
+    assert len(module.CALLS) == 2
+    assert [(status, source) for _, _, status, _, _, source in results] == \
+           [('PASS', tester.RUN), ('PASS', tester.RUN), ('FAIL', tester.DUPLICATE)]
+    # a duplicate took no time of its own
+    assert results[2][4] == 0
+
+
+# ---------------------------------------------------------------------------
+# the cache: a price is used again only while the program is the same
+# ---------------------------------------------------------------------------
+def test_cache_hit(pricer, tmp_path):
+    backend, module = pricer
+    cache = tester.ResultCache(str(tmp_path / 'cache'), backend.fingerprint(), tester.CACHE_SIZE)
+    arguments = tuple(tester.building_arguments(making_test('small')))
+    assert tester.pricing(arguments, backend, cache, 1)[3] == tester.RUN
+    assert tester.pricing(arguments, backend, cache, 1)[1:4:2] == ('120', tester.CACHED)
+    assert len(module.CALLS) == 1
+
+
+def test_cache_miss_after_program_changed(pricer, tmp_path):
+    backend, module = pricer
+    arguments = tuple(tester.building_arguments(making_test('small')))
+    cache = tester.ResultCache(str(tmp_path / 'cache'), backend.fingerprint(), tester.CACHE_SIZE)
+    tester.pricing(arguments, backend, cache, 1)
+    (tmp_path / 'pricer.py').write_text(PRICER.replace('100 +', '200 +'))
+    cache = tester.ResultCache(str(tmp_path / 'cache'), backend.fingerprint(), tester.CACHE_SIZE)
+    assert cache.getting(arguments) is None
+    assert tester.pricing(arguments, backend, cache, 1)[3] == tester.RUN
+    assert len(module.CALLS) == 2
+
+
+def test_cache_evicting_least_recently_used(tmp_path):
+    cache = tester.ResultCache(str(tmp_path / 'cache'), 'program', 20)
+    for number, car in enumerate(['small', 'medium', 'big']):
+        arguments = ('--car', car)
+        cache.putting(arguments, '1' * 10)
+        os.utime(cache.path(arguments), (1000 + number, 1000 + number))
+    # using the oldest one makes it the newest
+    assert cache.getting(('--car', 'small')) == '1' * 10
+    cache.putting(('--car', 'huge'), '1' * 10)
+    cache.evicting()
+    assert cache.getting(('--car', 'medium')) is None
+    assert cache.getting(('--car', 'big')) is None
+    assert cache.getting(('--car', 'small')) is not None
+    assert cache.getting(('--car', 'huge')) is not None
+
+
+def test_no_cache(pricer, tmp_path, monkeypatch, capsys):
+    backend, module = pricer
+    writing_data(tmp_path / 'data.csv', [('small', 'FALSE', '120'), ('small', 'TRUE', '130')])
+    running_main(monkeypatch, '--no-cache')
+    running_main(monkeypatch, '--no-cache')
+    assert len(module.CALLS) == 4
+    assert not os.path.exists(tester.CACHE_DIR)
+    assert '2 tests' in capsys.readouterr().out
+
+
+# ---------------------------------------------------------------------------
+# --order history: the cases that failed lately first, then the new ones, then the fast ones
+# ---------------------------------------------------------------------------
+def test_history_ordering(tmp_path):
+    path = str(tmp_path / 'history.sqlite')
+    slow, fast, failed, new = making_test('slow'), making_test('fast'), making_test('failed'), making_test('new')
+    history = tester.History(path)
+    history.adding(slow, 'PASS', 2.0, tester.RUN)
+    history.adding(fast, 'PASS', 1.0, tester.RUN)
+    history.adding(failed, 'FAIL', 3.0, tester.RUN)
+    history.closing()
+    history = tester.History(path)
+    cases = list(enumerate([slow, fast, failed, new]))
+    assert [test['car'] for _, test in history.ordering(cases)] == ['failed', 'new', 'fast', 'slow']
+    history.closing()
+
+
+def test_history_recent_runs(tmp_path):
+    path = str(tmp_path / 'history.sqlite')
+    fast, failed = making_test('fast'), making_test('failed')
+    history = tester.History(path)
+    history.adding(fast, 'PASS', 1.0, tester.RUN)
+    history.adding(failed, 'FAIL', 3.0, tester.RUN)
+    history.closing()
+    # the runs after it passed it, and after RECENT_RUNS of them it is ranked by its time
+    for _ in range(tester.RECENT_RUNS):
+        history = tester.History(path)
+        assert [test['car'] for _, test in history.ordering(enumerate([fast, failed]))] == ['failed', 'fast']
+        history.adding(failed, 'PASS', None, tester.CACHED)
+        history.closing()
+    history = tester.History(path)
+    assert [test['car'] for _, test in history.ordering(enumerate([fast, failed]))] == ['fast', 'failed']
+    history.closing()
+
+
+def test_history_after_file_order(pricer, tmp_path, monkeypatch, capsys):
+    writing_data(tmp_path / 'data.csv', [('small', 'FALSE', '120'), ('big', 'FALSE', '999')])
+    running_main(monkeypatch, '--no-cache')
+    capsys.readouterr()
+    with pytest.raises(SystemExit):
+        running_main(monkeypatch, '--no-cache', '--order', 'history', '--fail-fast')
+    assert capsys.readouterr().out.startswith("Test 1 Result: FAIL")
+
+
+# ---------------------------------------------------------------------------
+# --fail-fast and --max-failures stop the run and drop the tests that did not start
+# ---------------------------------------------------------------------------
+@pytest.mark.parametrize("arguments, failures", [(['--fail-fast'], 1), (['--max-failures', '3'], 3)])
+def test_stopping_early(pricer, tmp_path, monkeypatch, capsys, arguments, failures):
+    backend, module = pricer
+    rows = [(f'car{number}', 'FALSE', '999') for number in range(50)]
+    writing_data(tmp_path / 'data.csv', rows)
+    with pytest.raises(SystemExit) as error:
+        running_main(monkeypatch, '--no-cache', *arguments)
+    assert str(error.value) == f"stopped after {failures} tests didn't pass"
+    assert capsys.readouterr().out.count('Result: FAIL') == failures
+    assert len(module.CALLS) < len(rows)
+
+
+# ---------------------------------------------------------------------------
+# --junit and --json: a result is in the file as soon as the test is done
+# ---------------------------------------------------------------------------
+def test_junit_report(tmp_path):
+    path = tmp_path / 'report.xml'
+    report = tester.JunitReport(str(path), 'data.csv')
+    report.adding(0, making_test('small'), 'PASS', '120', 0.5)
+    assert 'name="Test 0"' in path.read_text()
+    report.adding(1, making_test('big', expected='<&">'), 'FAIL', '120', 0.25)
+    report.adding(2, making_test('big', expected=''), 'SKIP', '120', 0)
+    report.adding(3, making_test('big'), 'ERROR', 'exit code 1', 0)
+    report.closing()
+    suite = xml.etree.ElementTree.parse(path).getroot()
+    cases = suite.findall('testcase')
+    assert [case.get('name') for case in cases] == ['Test 0', 'Test 1', 'Test 2', 'Test 3']
+    assert list(cases[0]) == []
+    assert cases[1].find('failure').get('message') == 'got 120, expected <&">'
+    assert cases[2].find('skipped') is not None
+    assert cases[3].find('error').get('message') == 'ERROR'
+
+
+def test_json_report(tmp_path):
+    path = tmp_path / 'report.json'
+    report = tester.JsonReport(str(path))
+    report.adding(0, making_test('small'), 'PASS', '120', 0.5)
+    assert json.loads(path.read_text())['status'] == 'PASS'
+    report.adding(1, making_test('big'), 'TIMEOUT', None, 1.0)
+    report.closing()
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [(line['test'], line['car'], line['status'], line['got']) for line in lines] == \
+           [(0, 'small', 'PASS', '120'), (1, 'big', 'TIMEOUT', None)]
@@ -1,31 +1,525 @@
+import argparse
+import collections
 import csv
+import functools
+import hashlib
+import heapq
+import importlib
+import json
+import os
+import queue
+import shlex
+import shutil
+import sqlite3
 import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pprint import pprint
+from xml.sax.saxutils import escape, quoteattr
 
-with open('data.csv', mode='r') as csv_file:
-    csv_reader = csv.DictReader(csv_file)
-    tests = [{'car': row["car"], 'abs': row["ABS"], 'esp': row["ESP"], 'fcw': row["FCW"], 'ldw': row["LDW"],
-              'expected': row["Expected"]} for row in csv_reader]
+DATA = 'data.csv'
+TIMEOUT = 60
+PROGRAM = 'car_pricing.exe'
+SUBPROCESS = 'subprocess'
+CALLABLE = 'callable'
+WORKER = 'worker'
+CACHE_DIR = '.tester_cache'
+CACHE_SIZE = 16 * 1024 * 1024
+RUN = 'run'
+CACHED = 'cached'
+DUPLICATE = 'duplicate'
+SLOWEST = 5
+THRESHOLD = 0.2
+PERCENTILES = {'p50': 50, 'p90': 90, 'p99': 99, 'max': 100}
+# the percentiles that are compared with the baseline, the max is a single test and too noisy
+COMPARED = ['p50', 'p90', 'p99']
+HISTORY = '.tester_history.sqlite'
+FILE_ORDER = 'file'
+HISTORY_ORDER = 'history'
+# a case that failed in one of the last runs is run first
+RECENT_RUNS = 5
+# how many tests for every job are read from the csv before the first of them is reported
+WINDOW = 4
 
-for i, test in enumerate(tests):
-    command = ['car_pricing.exe']
 
-    command.append('--car')
-    command.append(test['car'])
+def reading_tests(path):
+    # the rows are read one at a time while the tests run
+    with open(path, mode='r') as csv_file:
+        csv_reader = csv.DictReader(csv_file)
+        for row in csv_reader:
+            yield {'car': row["car"], 'abs': row["ABS"], 'esp': row["ESP"], 'fcw': row["FCW"], 'ldw': row["LDW"],
+                   'expected': row["Expected"]}
+
+
+def building_arguments(test):
+    arguments = []
+
+    arguments.append('--car')
+    arguments.append(test['car'])
 
     if test['abs'].lower() == 'true':
-        command.append("--abs")
+        arguments.append("--abs")
     if test['esp'].lower() == 'true':
-        command.append("--esp")
+        arguments.append("--esp")
     if test['fcw'].lower() == 'true':
-        command.append("--fcw")
+        arguments.append("--fcw")
     if test['ldw'].lower() == 'true':
-        command.append("--ldw")
+        arguments.append("--ldw")
+    return arguments
+
+
+def hashing_file(path):
+    # the hash of a file, or of its name if there is no such file
+    digest = hashlib.sha256()
+    try:
+        with open(path, 'rb') as f:
+            for chunk in iter(functools.partial(f.read, 1 << 20), b''):
+                digest.update(chunk)
+    except (OSError, TypeError):
+        digest.update(str(path).encode('utf_8'))
+    return digest.hexdigest()
+
+
+class SubprocessBackend:
+    # a new process of the program for every test, started without a shell
+    def __init__(self, program):
+        self.program = program
+
+    def pricing(self, arguments, timeout):
+        return subprocess.check_output([self.program] + arguments, timeout=timeout).decode('utf_8')
+
+    def fingerprint(self):
+        return hashing_file(shutil.which(self.program) or self.program)
+
+    def closing(self):
+        pass
+
+
+class CallableBackend:
+    # a python function given as module:function, it gets the arguments of the program and returns the price
+    def __init__(self, target):
+        module_name, _, function_name = target.partition(':')
+        self.function = getattr(importlib.import_module(module_name), function_name)
+
+    def pricing(self, arguments, timeout):
+        # the function runs in this process, so the timeout can't stop it
+        return str(self.function(arguments))
+
+    def fingerprint(self):
+        module = sys.modules[self.function.__module__]
+        return hashing_file(getattr(module, '__file__', None)) + ':' + self.function.__qualname__
+
+    def closing(self):
+        pass
+
+
+class WorkerBackend:
+    # one process for the whole run, it gets the arguments of a test as a line on stdin and
+    # answers with the price in a line on stdout. the tests take turns on it
+    def __init__(self, command):
+        self.command = shlex.split(command, posix=os.name != 'nt')
+        self.lock = threading.Lock()
+        self.starting()
+
+    def starting(self):
+        self.process = subprocess.Popen(self.command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+                                        bufsize=1)
+        # the lines are read by a thread so waiting for one can have a timeout
+        self.lines = queue.Queue()
+        threading.Thread(target=self.reading, args=(self.process, self.lines), daemon=True).start()
+
+    @staticmethod
+    def reading(process, lines):
+        for line in process.stdout:
+            lines.put(line)
+        lines.put(None)
+
+    def restarting(self):
+        self.process.kill()
+        self.process.wait()
+        self.starting()
+
+    def pricing(self, arguments, timeout):
+        with self.lock:
+            try:
+                self.process.stdin.write(' '.join(arguments) + '\n')
+                self.process.stdin.flush()
+                line = self.lines.get(timeout=timeout)
+            except OSError:
+                line = None
+            except queue.Empty:
+                # the answer can still come later, a new worker keeps the answers in order
+                self.restarting()
+                raise subprocess.TimeoutExpired(self.command, timeout) from None
+            if line is None:
+                returncode = self.process.wait()
+                self.starting()
+                raise subprocess.CalledProcessError(returncode, self.command)
+            return line
+
+    def fingerprint(self):
+        # the program of the worker and every file in its command line, like a script it runs
+        paths = [shutil.which(self.command[0]) or self.command[0]] + self.command[1:]
+        return ' '.join(self.command) + ':' + ':'.join(hashing_file(path) for path in paths if os.path.isfile(path))
+
+    def closing(self):
+        self.process.stdin.close()
+        self.process.wait()
+
+
+class ResultCache:
+    # the prices the backend gave, a file for every arguments of a test under the fingerprint of the backend,
+    # so a result is used again only while the program is the same
+    def __init__(self, directory, fingerprint, max_size):
+        self.directory = directory
+        self.fingerprint = fingerprint
+        self.max_size = max_size
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, arguments):
+        key = hashlib.sha256('\0'.join((self.fingerprint,) + arguments).encode('utf_8')).hexdigest()
+        return os.path.join(self.directory, key)
+
+    def getting(self, arguments):
+        path = self.path(arguments)
+        try:
+            with open(path, mode='r') as f:
+                test_result = f.read()
+            # the time of the file is when it was last used, the oldest ones are evicted first
+            os.utime(path)
+        except OSError:
+            return None
+        return test_result
+
+    def putting(self, arguments, test_result):
+        descriptor, temp_path = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(descriptor, mode='w') as f:
+            f.write(test_result)
+        os.replace(temp_path, self.path(arguments))
+
+    def evicting(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file():
+                status = entry.stat()
+                entries.append((status.st_mtime, status.st_size, entry.path))
+        size = sum(entry_size for _, entry_size, _ in entries)
+        for _, entry_size, path in sorted(entries):
+            if size <= self.max_size:
+                break
+            os.remove(path)
+            size -= entry_size
+
+
+def making_backend(args):
+    if args.backend == CALLABLE:
+        return CallableBackend(args.callable)
+    elif args.backend == WORKER:
+        return WorkerBackend(args.worker)
+    return SubprocessBackend(args.program)
+
+
+def pricing(arguments, backend, cache, timeout):
+    # the price of one arguments of a test from the cache or from the backend, and the time it took
+    start = time.perf_counter()
+    if cache is not None:
+        test_result = cache.getting(arguments)
+        if test_result is not None:
+            return 'OK', test_result, time.perf_counter() - start, CACHED
+    try:
+        test_result = backend.pricing(list(arguments), timeout).strip()
+    except subprocess.TimeoutExpired:
+        return 'TIMEOUT', None, time.perf_counter() - start, RUN
+    except subprocess.CalledProcessError as error:
+        return 'ERROR', f"exit code {error.returncode}", time.perf_counter() - start, RUN
+    except Exception as error:
+        return 'ERROR', repr(error), time.perf_counter() - start, RUN
+    seconds = time.perf_counter() - start
+    if cache is not None:
+        cache.putting(arguments, test_result)
+    return 'OK', test_result, seconds, RUN
+
+
+def judging(test, status, test_result):
+    # a row without an expected price, like the ones generate_cases.py writes without an oracle
+    if not test['expected'].strip():
+        return 'SKIP'
+    if status != 'OK':
+        return status
+    try:
+        if float(test['expected']) == float(test_result):
+            return 'PASS'
+    except ValueError:
+        # the program printed something that is not a price
+        return 'ERROR'
+    return 'FAIL'
+
+
+def judged(i, test, future, source):
+    status, test_result, seconds, price_source = future.result()
+    if source == DUPLICATE:
+        # the first test with these arguments already counted the time
+        return i, test, judging(test, status, test_result), test_result, 0, DUPLICATE
+    return i, test, judging(test, status, test_result), test_result, seconds, price_source
+
+
+def running_tests(cases, backend, cache, jobs, timeout):
+    # the cases are (row number, test). every arguments is priced once and the threads only wait for
+    # the backend. the rows are read only a few jobs ahead of the first test that is not reported yet,
+    # and reported in their order
+    priced = {}
+    pending = collections.deque()
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        try:
+            for i, test in cases:
+                key = tuple(building_arguments(test))
+                if key in priced:
+                    pending.append((i, test, priced[key], DUPLICATE))
+                else:
+                    priced[key] = pool.submit(pricing, key, backend, cache, timeout)
+                    pending.append((i, test, priced[key], RUN))
+                while len(pending) > max(1, jobs) * WINDOW or (pending and pending[0][2].done()):
+                    yield judged(*pending.popleft())
+            while pending:
+                yield judged(*pending.popleft())
+        finally:
+            # when the results are not wanted anymore the tests that did not start are dropped
+            pool.shutdown(cancel_futures=True)
+
+
+class History:
+    # the last outcome and time of every case in a small sqlite database, a case is its arguments
+    # and its expected price
+    def __init__(self, path):
+        self.connection = sqlite3.connect(path)
+        self.connection.execute('CREATE TABLE IF NOT EXISTS cases (key TEXT PRIMARY KEY, status TEXT, seconds REAL,'
+                                ' runs INTEGER, failed_run INTEGER)')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS runs (id INTEGER PRIMARY KEY AUTOINCREMENT, started REAL)')
+        self.run = self.connection.execute('INSERT INTO runs (started) VALUES (?)', (time.time(),)).lastrowid
+        self.connection.commit()
+        self.updates = {}
+
+    @staticmethod
+    def key(test):
+        return ' '.join(building_arguments(test)) + ' = ' + test['expected']
+
+    def ordering(self, cases):
+        # the cases that failed lately first, then the new ones, then the rest, the fast ones first in each
+        known = {key: (failed_run, seconds) for key, failed_run, seconds
+                 in self.connection.execute('SELECT key, failed_run, seconds FROM cases')}
+
+        def rank(case):
+            failed_run, seconds = known.get(self.key(case[1]), (None, None))
+            if failed_run is not None and failed_run > self.run - 1 - RECENT_RUNS:
+                return 0, seconds or 0
+            elif seconds is None:
+                return 1, 0
+            return 2, seconds
+
+        return sorted(cases, key=rank)
+
+    def adding(self, test, status, seconds, source):
+        # the time is kept only when the backend really ran
+        self.updates[self.key(test)] = (status, seconds if source == RUN else None,
+                                        None if status in ('PASS', 'SKIP') else self.run)
+
+    def closing(self):
+        with self.connection:
+            self.connection.executemany(
+                'INSERT INTO cases (key, status, seconds, runs, failed_run) VALUES (?, ?, ?, 1, ?)'
+                ' ON CONFLICT (key) DO UPDATE SET status = excluded.status,'
+                ' seconds = coalesce(excluded.seconds, cases.seconds), runs = cases.runs + 1,'
+                ' failed_run = coalesce(excluded.failed_run, cases.failed_run)',
+                [(key,) + update for key, update in self.updates.items()])
+        self.connection.close()
+
+
+class JunitReport:
+    # a junit xml file that gets a testcase as soon as a test is done, the suite is closed at the end
+    def __init__(self, path, name):
+        self.file = open(path, mode='w')
+        self.file.write(f'<?xml version="1.0" encoding="utf-8"?>\n<testsuite name={quoteattr(name)}>\n')
+        self.file.flush()
+
+    def adding(self, i, test, status, test_result, seconds):
+        case = f'  <testcase classname="tester" name="Test {i}" time="{seconds:.6f}"'
+        message = f"got {test_result}, expected {test['expected']}"
+        if status == 'PASS':
+            self.file.write(case + '/>\n')
+        elif status == 'FAIL':
+            self.file.write(f'{case}>\n    <failure message={quoteattr(message)}/>\n  </testcase>\n')
+        elif status == 'SKIP':
+            self.file.write(f'{case}>\n    <skipped message="no expected price"/>\n  </testcase>\n')
+        else:
+            self.file.write(f'{case}>\n    <error message={quoteattr(status)}>{escape(message)}</error>\n'
+                            f'  </testcase>\n')
+        self.file.flush()
+
+    def closing(self):
+        self.file.write('</testsuite>\n')
+        self.file.close()
+
+
+class JsonReport:
+    # a json line for every test as soon as it is done
+    def __init__(self, path):
+        self.file = open(path, mode='w')
+
+    def adding(self, i, test, status, test_result, seconds):
+        self.file.write(json.dumps({'test': i, **test, 'got': test_result, 'status': status,
+                                    'seconds': seconds}) + '\n')
+        self.file.flush()
+
+    def closing(self):
+        self.file.close()
+
+
+class Latencies:
+    # the time of every test that really ran the backend, the cached and duplicate ones took no time,
+    # and the slowest tests in a small heap
+    def __init__(self, slowest):
+        self.seconds = []
+        self.slowest = []
+        self.size = slowest
+
+    def adding(self, i, test, seconds):
+        self.seconds.append(seconds)
+        if self.size <= 0:
+            return
+        if len(self.slowest) < self.size:
+            heapq.heappush(self.slowest, (seconds, i, test))
+        elif seconds > self.slowest[0][0]:
+            heapq.heappushpop(self.slowest, (seconds, i, test))
+
+    def percentiles(self):
+        # nearest rank percentiles in seconds, None when no test ran
+        ordered = sorted(self.seconds)
+        if not ordered:
+            return None
+        return {name: ordered[max(0, -(-len(ordered) * rank // 100) - 1)] for name, rank in PERCENTILES.items()}
+
+    def printing(self):
+        latency = self.percentiles()
+        if latency is None:
+            return
+        print(f"latency of {len(self.seconds)} tests: "
+              + ', '.join(f"{name} {seconds * 1000:.1f}ms" for name, seconds in latency.items()))
+        for seconds, i, test in sorted(self.slowest, reverse=True):
+            print(f"  Test {i}: {seconds * 1000:.1f}ms {' '.join(building_arguments(test))}")
+
+
+def comparing_latency(latency, baseline, threshold):
+    # the percentiles that got slower than the baseline by more than the threshold, 0.2 is 20%
+    return [(name, baseline[name], latency[name]) for name in COMPARED
+            if name in baseline and latency[name] > baseline[name] * (1 + threshold)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="running the tests of data.csv on car_pricing.exe")
+    parser.add_argument('--data', default=DATA, help="the csv file of the tests")
+    parser.add_argument('--jobs', type=int, default=1, help="how many tests run at the same time")
+    parser.add_argument('--timeout', type=float, default=TIMEOUT, help="seconds until a test is stopped")
+    parser.add_argument('--backend', choices=[SUBPROCESS, CALLABLE, WORKER], default=SUBPROCESS,
+                        help="a process for every test, a python function, or one process that gets a test in"
+                             " every line")
+    parser.add_argument('--program', default=PROGRAM, help="the program of the subprocess backend")
+    parser.add_argument('--callable', metavar='MODULE:FUNCTION', help="the function of the callable backend")
+    parser.add_argument('--worker', metavar='COMMAND', help="the command that starts the worker backend")
+    parser.add_argument('--cache-dir', default=CACHE_DIR, help="where the prices of the backend are kept")
+    parser.add_argument('--cache-size', type=int, default=CACHE_SIZE,
+                        help="bytes the cache keeps, the results used the longest time ago are removed first")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="run every test again, the prices are not read or saved and no cache is created")
+    parser.add_argument('--junit', metavar='PATH', help="write the results to a junit xml file while they run")
+    parser.add_argument('--json', metavar='PATH', help="write a json line for every result while they run")
+    parser.add_argument('--history', default=HISTORY,
+                        help="the sqlite file of the outcomes and times of the cases, every run adds to it")
+    parser.add_argument('--order', choices=[FILE_ORDER, HISTORY_ORDER], default=FILE_ORDER,
+                        help="history runs the cases that failed lately and the fast ones first, it reads"
+                             " the whole csv before starting")
+    parser.add_argument('--fail-fast', action='store_true', help="stop at the first test that doesn't pass")
+    parser.add_argument('--max-failures', type=int, default=None, help="stop after this many tests didn't pass")
+    parser.add_argument('--slowest', type=int, default=SLOWEST, help="how many of the slowest tests to print")
+    parser.add_argument('--save-baseline', metavar='PATH', help="save the latency percentiles to this json file")
+    parser.add_argument('--baseline', metavar='PATH', help="a json file of latency percentiles to compare with")
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help="how much slower than the baseline is a regression, 0.2 is 20%%")
+    args = parser.parse_args()
+    if args.backend == CALLABLE and args.callable is None:
+        parser.error("the callable backend needs --callable")
+    if args.backend == WORKER and args.worker is None:
+        parser.error("the worker backend needs --worker")
+    max_failures = 1 if args.fail_fast else args.max_failures
+    # every run records its outcomes, so --order history has them even after runs in the file order
+    history = History(args.history)
+    cases = enumerate(reading_tests(args.data))
+    if args.order == HISTORY_ORDER:
+        cases = history.ordering(cases)
+    backend = making_backend(args)
+    # the cache is created only when it is used
+    cache = None
+    if not args.no_cache:
+        cache = ResultCache(args.cache_dir, backend.fingerprint(), args.cache_size)
+    reports = []
+    if args.junit is not None:
+        reports.append(JunitReport(args.junit, args.data))
+    if args.json is not None:
+        reports.append(JsonReport(args.json))
+
+    start = time.perf_counter()
+    total = 0
+    count = 0
+    failures = 0
+    sources = dict.fromkeys([RUN, CACHED, DUPLICATE], 0)
+    latencies = Latencies(args.slowest)
+    results = running_tests(cases, backend, cache, args.jobs, args.timeout)
+    for i, test, status, test_result, seconds, source in results:
+        count += 1
+        total += seconds
+        sources[source] += 1
+        if source == RUN:
+            latencies.adding(i, test, seconds)
+        if status == 'TIMEOUT':
+            print(f"Test {i} Result: TIMEOUT (after {args.timeout}s, expected {test['expected']})")
+        else:
+            print(f"Test {i} Result: {status} (got {test_result}, expected {test['expected']})")
+        for report in reports:
+            report.adding(i, test, status, test_result, seconds)
+        history.adding(test, status, seconds, source)
+        if status not in ('PASS', 'SKIP'):
+            failures += 1
+            if max_failures is not None and failures >= max_failures:
+                results.close()
+                break
+    wall = time.perf_counter() - start
+    history.closing()
+    backend.closing()
+    if cache is not None:
+        cache.evicting()
+    for report in reports:
+        report.closing()
+    print(f"{count} tests in {wall:.2f}s wall time, {total:.2f}s summed over the tests"
+          f" ({sources[RUN]} run, {sources[CACHED]} from the cache, {sources[DUPLICATE]} duplicates)")
+    latencies.printing()
+    if max_failures is not None and failures >= max_failures:
+        sys.exit(f"stopped after {failures} tests didn't pass")
+    latency = latencies.percentiles()
+    if latency is None:
+        return
+    if args.save_baseline is not None:
+        with open(args.save_baseline, mode='w') as f:
+            json.dump(latency, f, indent=2)
+    if args.baseline is not None:
+        with open(args.baseline, mode='r') as f:
+            regressions = comparing_latency(latency, json.load(f), args.threshold)
+        for name, before, after in regressions:
+            print(f"regression: {name} {before * 1000:.1f}ms -> {after * 1000:.1f}ms")
+        if regressions:
+            sys.exit(f"the latency regressed by more than {args.threshold:.0%}")
 
-    test_result = subprocess.check_output(command, shell=True)
-    test_result = test_result.strip().decode('utf_8')
 
-    if float(test['expected']) == float(test_result):
-        print(f"Test {i} Result: PASS (got {test_result}, expected {test['expected']})")
-    else:
-        print(f"Test {i} Result: FAIL (got {test_result}, expected {test['expected']})")
+if __name__ == '__main__':
+    main()